@@ -0,0 +1,363 @@
+"""Benchmarks for the hot paths: task store, review scheduler, search and duplicate indexes and task table
+
+    python benchmark.py                               run 1k, 100k and 1M task decks
+    python benchmark.py --sizes 1000,100000 -o results.json
+    python benchmark.py --baseline baseline.json      fail when a metric regresses
+    python benchmark.py --save-baseline baseline.json
+
+Metrics ending in _per_s are better when higher; every other metric is a duration in
+milliseconds and better when lower. A run fails when a metric in BUDGETS exceeds its limit. The table benchmark needs a display: it uses $DISPLAY,
+or starts Xvfb when it is installed, and is skipped otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from task_store import DAY, NO_FILTER, KeysetPager, TaskStore, name_hash
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+WORDS = ('apple', 'river', 'theorem', 'verb', 'capital', 'molecule', 'sonata', 'border', 'equation',
+         'glacier', 'syntax', 'harbor', 'protein', 'monarch', 'vector', 'orbit', 'lattice', 'fossil',
+         'dialect', 'circuit', 'meadow', 'prism', 'ledger', 'canyon', 'enzyme', 'fable', 'quartz')
+
+SEARCH_QUERIES = ('capital riv', 'theorem', 'glacier syntax', 'orbit lat', 'enzyme')
+
+# Absolute limits in milliseconds, checked on every run: (deck size, metric) -> limit
+BUDGETS = {
+    ('100000', 'search.keystroke_p50_ms'): 10.0
+}
+
+
+def synthetic_rows(count, seed=0, now=None):
+    """Yield store rows (name, description, created, next_review, name_hash) of a random deck"""
+    rng = random.Random(seed)
+    now = time.time() if now is None else now
+    for index in range(count):
+        name = f'{rng.choice(WORDS)} {rng.choice(WORDS)} {index}'
+        description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+        created = now - rng.random() * 365 * DAY
+        next_review = now + (rng.random() - 0.3) * 60 * DAY
+        yield name, description, created, next_review, name_hash(name)
+
+
+def percentile(samples, fraction):
+    """Return the value below which the given fraction of samples fall"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timed(function, *args):
+    """Return (result, elapsed milliseconds) of one call"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def populate(store, size):
+    """Fill the store with a synthetic deck; returns the insert rate in rows per second"""
+    rows = list(synthetic_rows(size))
+    _, elapsed = timed(store.insert_many, iter(rows))
+    return size / (elapsed / 1000)
+
+
+def bench_store(store, size):
+    results = {}
+    single = []
+    for index in range(200):
+        _, elapsed = timed(store.add_task, f'single {index}', 'benchmark')
+        single.append(elapsed)
+    results['store.add_task_p50_ms'] = percentile(single, 0.5)
+    results['store.add_task_p99_ms'] = percentile(single, 0.99)
+
+    _, results['store.due_query_ms'] = timed(store.due_tasks, time.time(), 100)
+    _, results['store.count_due_ms'] = timed(store.count_due)
+
+    # Pages as the task list reads them: scrolling on from a fetched page uses its last key,
+    # a jump to an unvisited position falls back to OFFSET
+    pager = KeysetPager(store, 'name', task_filter=NO_FILTER)
+    pages = []
+    for offset in range(0, min(size, 200 * 50), 200):
+        _, elapsed = timed(pager.page, offset, 200)
+        pages.append(elapsed)
+    results['store.page_p50_ms'] = percentile(pages, 0.5)
+
+    rng = random.Random(3)
+    jumps = []
+    for _ in range(20):
+        pager = KeysetPager(store, 'name', task_filter=NO_FILTER)
+        _, elapsed = timed(pager.page, rng.randrange(max(1, size // 200)) * 200, 200)
+        jumps.append(elapsed)
+    results['store.page_jump_p50_ms'] = percentile(jumps, 0.5)
+    return results
+
+
+def bench_scheduler(store, size):
+    from scheduler import ReviewScheduler
+
+    schedule = store.schedule()
+    clock = [0.0]
+    fired = []
+    drained = threading.Event()
+
+    def on_due(task_ids):
+        fired.extend(task_ids)
+        if len(fired) >= len(schedule):
+            drained.set()
+
+    scheduler = ReviewScheduler(on_due, clock=lambda: clock[0])
+    _, elapsed = timed(scheduler.load, schedule)
+    results = {'scheduler.load_ms': elapsed}
+
+    rng = random.Random(1)
+    moves = [(rng.choice(schedule)[0], rng.random() * 30 * DAY) for _ in range(100000)]
+    start = time.perf_counter()
+    for task_id, due in moves:
+        scheduler.schedule(task_id, due)
+    results['scheduler.reschedule_per_s'] = len(moves) / (time.perf_counter() - start)
+
+    # Everything becomes due at once; the scheduler thread pops the whole queue
+    clock[0] = float('inf')
+    start = time.perf_counter()
+    scheduler.start()
+    drained.wait()
+    results['scheduler.pop_per_s'] = len(schedule) / (time.perf_counter() - start)
+    scheduler.stop()
+    return results
+
+
+def bench_search(store, size):
+    from search_index import SearchIndex
+    from task_model import TaskTable
+
+    index = SearchIndex()
+    _, elapsed = timed(index.build, store)
+    results = {'search.build_ms': elapsed}
+    table = TaskTable.from_store(store)
+
+    # What the task list does per keystroke: look the prefix up, sort and filter the hits in the
+    # task table, then read the first screen of rows from the store
+    lookups = []
+    keystrokes = []
+    for query in SEARCH_QUERIES:
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            task_ids = index.search(query[:length])
+            lookups.append((time.perf_counter() - start) * 1000)
+            ordered = table.filter_ids(task_ids, 'id', False, NO_FILTER)
+            store.get_summaries(ordered[:20])
+            keystrokes.append((time.perf_counter() - start) * 1000)
+    results['search.lookup_p50_ms'] = percentile(lookups, 0.5)
+    results['search.keystroke_p50_ms'] = percentile(keystrokes, 0.5)
+    results['search.keystroke_p99_ms'] = percentile(keystrokes, 0.99)
+    return results
+
+
+def bench_duplicates(store, size):
+    from duplicates import DuplicateIndex
+
+    index = DuplicateIndex()
+    _, elapsed = timed(index.build, store)
+    results = {'duplicates.build_ms': elapsed}
+
+    rng = random.Random(1)
+    lookups = []
+    for task_id in rng.sample(range(1, size + 1), min(size, 200)):
+        name, description = store.get_many([task_id])[0][1:3]
+        _, elapsed = timed(index.similar, name + ' x', description)
+        lookups.append(elapsed)
+    results['duplicates.lookup_p50_ms'] = percentile(lookups, 0.5)
+    results['duplicates.lookup_p99_ms'] = percentile(lookups, 0.99)
+    return results
+
+
+def start_display():
+    """Make sure a display is available; returns (Xvfb process or None, skip reason or None)"""
+    if os.environ.get('DISPLAY'):
+        return None, None
+    if shutil.which('Xvfb') is None:
+        return None, 'no DISPLAY and Xvfb is not installed'
+    display = ':97'
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    if process.poll() is not None:
+        return None, 'Xvfb failed to start'
+    os.environ['DISPLAY'] = display
+    return process, None
+
+
+def bench_table(store, size):
+    import tkinter as tk
+    from search_index import SearchIndex
+    from showing_tasks import ListTasks
+    from task_model import TaskTable
+    from theme import setup_theme
+
+    def update_until(condition, timeout=30.0):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("table did not finish loading")
+            root.update()
+
+    root = tk.Tk()
+    root.withdraw()
+    setup_theme(root)
+    try:
+        index = SearchIndex()
+        index.build(store)
+        start = time.perf_counter()
+        window = ListTasks(root, store, index, task_table=TaskTable.from_store(store))
+        tree = window.tasks_table
+        update_until(lambda: tree.get_children(''))
+        results = {'table.first_paint_ms': (time.perf_counter() - start) * 1000}
+
+        # Jump to random positions and wait until the rows of the new window are on screen
+        rng = random.Random(2)
+        view = window.table_view
+        scrolls = []
+        for _ in range(30):
+            offset = rng.randrange(max(1, view.total - view.visible_rows))
+            start = time.perf_counter()
+            view.scroll_to(offset)
+            expected = str(view.offset + 1)
+            update_until(lambda: tree.get_children('')[:1] == (expected,))
+            scrolls.append((time.perf_counter() - start) * 1000)
+        results['table.scroll_p50_ms'] = percentile(scrolls, 0.5)
+        results['table.scroll_p99_ms'] = percentile(scrolls, 0.99)
+
+        # Type whole queries and wait until the hits from the search worker are on screen
+        searches = []
+        for query in SEARCH_QUERIES:
+            previous = view.source
+            start = time.perf_counter()
+            window.search_query.set(query)
+            update_until(lambda: view.source is not previous)
+            searches.append((time.perf_counter() - start) * 1000)
+        results['table.search_p50_ms'] = percentile(searches, 0.5)
+        window.close_window()
+        return results
+    finally:
+        root.destroy()
+
+
+BENCHMARKS = {
+    'store': bench_store,
+    'scheduler': bench_scheduler,
+    'search': bench_search,
+    'duplicates': bench_duplicates,
+    'table': bench_table
+}
+
+
+def run(sizes, names, progress=None):
+    """Run the benchmarks on fresh decks of each size; returns the result document"""
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': {},
+        'skipped': {}
+    }
+    xvfb = None
+    if 'table' in names:
+        xvfb, reason = start_display()
+        if reason is not None:
+            document['skipped']['table'] = reason
+            names = [name for name in names if name != 'table']
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                store = TaskStore(os.path.join(directory, 'bench.db'))
+                if progress is not None:
+                    progress(f'generating {size} tasks')
+                metrics = {'store.insert_per_s': populate(store, size)}
+                for name in names:
+                    if progress is not None:
+                        progress(f'{name} with {size} tasks')
+                    metrics.update(BENCHMARKS[name](store, size))
+                store.close()
+            document['results'][str(size)] = metrics
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+    return document
+
+
+def compare(current, baseline, tolerance):
+    """Return (size, metric, baseline, current, change) tuples that regressed beyond tolerance"""
+    regressions = []
+    for size, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            previous = baseline.get('results', {}).get(size, {}).get(metric)
+            if not previous:
+                continue
+            change = value / previous - 1
+            worse = -change if metric.endswith('_per_s') else change
+            if worse > tolerance:
+                regressions.append((size, metric, previous, value, change))
+    return regressions
+
+
+def over_budget(document):
+    """Return (size, metric, limit, value) tuples of the metrics in BUDGETS above their limit"""
+    failures = []
+    for (size, metric), limit in BUDGETS.items():
+        value = document['results'].get(size, {}).get(metric)
+        if value is not None and value > limit:
+            failures.append((size, metric, limit, value))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the task store, scheduler, search and table")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated deck sizes (default: %(default)s)")
+    parser.add_argument('--only', default=','.join(BENCHMARKS),
+                        help="comma separated benchmarks to run (default: %(default)s)")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against a stored result file")
+    parser.add_argument('--save-baseline', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = [name for name in args.only.split(',') if name]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    document = run(sizes, names, progress=lambda text: print(text, file=sys.stderr))
+    text = json.dumps(document, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as result_file:
+                result_file.write(text + '\n')
+
+    failed = False
+    for size, metric, limit, value in over_budget(document):
+        print(f'OVER BUDGET {metric} ({size} tasks): {value:.4g} > {limit:.4g}', file=sys.stderr)
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(document, json.load(baseline_file), args.tolerance)
+        for size, metric, previous, value, change in regressions:
+            print(f'REGRESSION {metric} ({size} tasks): {previous:.4g} -> {value:.4g} ({change:+.0%})',
+                  file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
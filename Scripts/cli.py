@@ -0,0 +1,356 @@
+"""Command line interface and headless daemon; never imports tkinter
+
+    python cli.py daemon                 run reminders and store maintenance in the background
+    python cli.py add NAME [DESCRIPTION] track a new task
+    python cli.py list-due [--limit N]   show tasks waiting for repetition
+    python cli.py review TASK_ID GRADE   record a review graded 0-5
+    python cli.py import PATH            import a CSV/TSV/Anki deck
+    python cli.py restore PATH           load tasks and history from a .blsnap snapshot
+    python cli.py stats                  show deck counters
+    python cli.py sync URL               exchange changes with a sync server (see sync.py)
+    python cli.py decks [--new NAME]     list decks with their due counts, or create one
+    python cli.py maintain               check, compact and (--reschedule) re-plan every deck, one process per core
+
+Every command works on the Default deck unless --deck NAME is given.
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from task_store import DAY, DEFAULT_DB_PATH, TaskFilter, TaskStore, day_start
+from decks import DeckManager
+from journal import ReviewJournal, journal_path_for
+from notifications import NotificationDispatcher, default_backend, task_summarizer
+from scheduler import ReviewScheduler
+
+
+@contextlib.contextmanager
+def open_journal(store):
+    """Journal writes made inside the block and fold them into the store on exit
+
+    While another process owns the deck's journal (the app is open) the events are handed to it
+    through the journal inbox instead and show up in the store once it compacts.
+    """
+    journal = ReviewJournal(journal_path_for(store.path))
+    journal.open(store)
+    store.subscribe(journal.on_store_change)
+    try:
+        yield journal
+    finally:
+        store.unsubscribe(journal.on_store_change)
+        journal.close(store)
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+class Daemon:
+    """Runs the review scheduler, notifications and store maintenance without a window
+
+    Changes committed by other processes (the GUI, CLI commands) are picked up by polling
+    the database's data version, so the daemon needs no connection to them. It records no
+    events and leaves the journal to the processes that do.
+    """
+
+    def __init__(self, store, poll_interval=30.0, optimize_interval=3600.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.optimize_interval = optimize_interval
+        self.stopped = threading.Event()
+        self.announced_until = None
+
+        self.notifier = NotificationDispatcher(
+            default_backend(),
+            summarize=task_summarizer(store),
+            on_exit=store.release
+        )
+        self.scheduler = ReviewScheduler(self.on_due)
+
+    def run(self):
+        """Serve until stop() is called or SIGINT/SIGTERM arrives"""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stop())
+
+        self.store.subscribe(self.on_store_change)
+        self.notifier.start()
+        self.scheduler.start()
+        self.reload()
+
+        version = self.store.data_version()
+        last_optimize = time.monotonic()
+        try:
+            while not self.stopped.wait(self.poll_interval):
+                current = self.store.data_version()
+                if current != version:
+                    version = current
+                    self.reload()
+                if time.monotonic() - last_optimize >= self.optimize_interval:
+                    last_optimize = time.monotonic()
+                    self.store.optimize()
+        finally:
+            self.scheduler.stop()
+            self.notifier.stop()
+            self.store.close()
+
+    def stop(self):
+        """Ask the daemon to shut down; safe to call from a signal handler"""
+        self.stopped.set()
+
+    def reload(self):
+        """Queue every task that has not been announced yet"""
+        schedule = self.store.schedule()
+        if self.announced_until is not None:
+            schedule = [(task_id, due) for task_id, due in schedule if due > self.announced_until]
+        self.scheduler.load(schedule)
+
+    def on_due(self, task_ids):
+        """Scheduler callback; tasks due before now have been announced"""
+        self.announced_until = time.time()
+        self.notifier.notify_due(task_ids)
+
+    def on_store_change(self, event, rows):
+        if event in ('reload', 'import'):
+            self.reload()
+            return
+        if event not in ('add', 'update'):
+            return
+        for row in rows:
+            self.scheduler.schedule(row[0], row[4])
+        self.notifier.discard(row[0] for row in rows)
+
+
+def command_daemon(store, args):
+    """Run the daemon until it is stopped"""
+    Daemon(store, poll_interval=args.poll_interval).run()
+
+
+def command_add(store, args):
+    """Track a new task and print its id"""
+    with open_journal(store):
+        task_id = store.add_task(args.name, args.description)
+    print(task_id)
+
+
+def command_list_due(store, args):
+    """Print the tasks due now, oldest first"""
+    rows = store.due_tasks(limit=args.limit)
+    if args.json:
+        for task_id, name, description, created, next_review, repeated in rows:
+            print(json.dumps({'id': task_id, 'name': name, 'next_review': next_review,
+                              'repeated': repeated}, ensure_ascii=False))
+        return
+    for task_id, name, description, created, next_review, repeated in rows:
+        print(f'{task_id}\t{format_time(next_review)}\t{repeated}\t{name}')
+
+
+def command_review(store, args):
+    """Record a graded review and print when the task is due next"""
+    before = store.get_task(args.task_id)
+    if before is None:
+        raise SystemExit(f"No task with id {args.task_id}")
+    with open_journal(store) as journal:
+        journal.record_review(args.task_id, args.grade)
+    task = store.get_task(args.task_id)
+    if task == before:
+        print("Review queued; the app that has this deck open applies it")
+        return
+    print(f'Next review: {format_time(task[4])}')
+
+
+def command_import(store, args):
+    """Import a deck file and print the number of imported tasks"""
+    from importer import import_file
+
+    def progress(stats):
+        print(f'\r{stats.fraction:6.1%}  {stats.imported} imported, {stats.duplicates} duplicates, '
+              f'{stats.invalid} invalid', end='', file=sys.stderr, flush=True)
+
+    with open_journal(store):
+        stats = import_file(store, args.path, progress=progress)
+    print(file=sys.stderr)
+    print(stats.imported)
+
+
+def command_restore(store, args):
+    """Load a snapshot and print the number of restored tasks"""
+    from exporter import restore_snapshot
+
+    # The journal is folded first: restoring moves its sequence past the snapshot's history
+    with open_journal(store) as journal:
+        if not journal.owner:
+            raise SystemExit("The deck is open in another process; close it before restoring")
+        try:
+            count = restore_snapshot(store, args.path)
+        except (OSError, ValueError) as error:
+            raise SystemExit(f"Cannot restore {args.path}: {error}")
+    print(count)
+
+
+def command_stats(store, args):
+    """Print the deck counters"""
+    today = day_start(time.time())
+    counters = {
+        'tasks': store.count(),
+        'due_now': store.count_due(),
+        'due_today': store.count_filtered(TaskFilter(due_before=today + DAY)),
+        'new': store.count_filtered(TaskFilter(repeated_max=0)),
+        'learning': store.count_filtered(TaskFilter(repeated_min=1, repeated_max=3)),
+        'mature': store.count_filtered(TaskFilter(repeated_min=4))
+    }
+    if args.json:
+        print(json.dumps(counters))
+    else:
+        for key, value in counters.items():
+            print(f'{key.replace("_", " "):<10} {value}')
+
+
+def command_sync(store, args):
+    """Sync the deck with a server and print what moved"""
+    from sync import SyncClient, SyncError
+
+    # Opening the journal folds reviews made since the last compaction into the log first,
+    # unless the app owns it; reviews it has not folded yet go out with the next sync
+    with open_journal(store):
+        try:
+            report = SyncClient(store, args.url).sync()
+        except SyncError as error:
+            raise SystemExit(str(error))
+    print(report)
+
+
+def command_decks(store, args):
+    """List decks with their due counts, or create one"""
+    if args.new:
+        try:
+            deck = args.decks.create(args.new)
+        except ValueError as error:
+            raise SystemExit(str(error))
+        print(deck.path)
+        return
+    for name, summary in args.decks.summaries().items():
+        if isinstance(summary, Exception):
+            print(f'{name}\terror: {summary}')
+        else:
+            print(f'{name}\t{summary[0]} tasks\t{summary[1]} due today')
+
+
+def command_maintain(store, args):
+    """Check and compact every deck on a process pool; exits 1 when a deck has problems"""
+    if args.workers:
+        args.decks.workers = args.workers
+    # The deck opened by this command is closed first so it is compacted like the others
+    store.close()
+    started = time.perf_counter()
+    reports = {'integrity': args.decks.check(), 'folded reviews': args.decks.compact()}
+    if args.reschedule:
+        from intervals import SM2Parameters
+
+        params = {name: value for name, value in (('interval_modifier', args.interval_modifier),
+                                                  ('max_interval', args.max_interval)) if value is not None}
+        reports['rescheduled'] = args.decks.reschedule(SM2Parameters(**params))
+    failed = False
+    for name in reports['integrity']:
+        parts = []
+        for label, results in reports.items():
+            result = results[name]
+            if isinstance(result, Exception) or (label == 'integrity' and result):
+                failed = True
+            if label == 'integrity' and not isinstance(result, Exception):
+                result = '; '.join(result) if result else 'ok'
+            parts.append(f'{label}: {result}')
+        print(f'{name}\t' + '\t'.join(parts))
+    print(f'{len(reports["integrity"])} deck(s) in {time.perf_counter() - started:.1f} s', file=sys.stderr)
+    if failed:
+        raise SystemExit(1)
+
+
+def grade(value):
+    number = int(value)
+    if not 0 <= number <= 5:
+        raise argparse.ArgumentTypeError("grade must be between 0 and 5")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='better-learning', description="Better Learning without the window")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Default deck database (default: %(default)s)")
+    parser.add_argument('--deck', help="deck to work on (default: Default)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    daemon = commands.add_parser('daemon', help="send review reminders in the background")
+    daemon.add_argument('--poll-interval', type=float, default=30.0,
+                        help="seconds between checks for changes made by other processes")
+    daemon.set_defaults(handler=command_daemon)
+
+    add = commands.add_parser('add', help="track a new task")
+    add.add_argument('name')
+    add.add_argument('description', nargs='?', default='')
+    add.set_defaults(handler=command_add)
+
+    list_due = commands.add_parser('list-due', help="show tasks due for repetition")
+    list_due.add_argument('--limit', type=int, default=20)
+    list_due.add_argument('--json', action='store_true', help="one JSON object per line")
+    list_due.set_defaults(handler=command_list_due)
+
+    review = commands.add_parser('review', help="record a review of a task")
+    review.add_argument('task_id', type=int)
+    review.add_argument('grade', type=grade, help="0 (forgotten) to 5 (perfect)")
+    review.set_defaults(handler=command_review)
+
+    importer = commands.add_parser('import', help="import a CSV, TSV or Anki text deck")
+    importer.add_argument('path')
+    importer.set_defaults(handler=command_import)
+
+    restore = commands.add_parser('restore', help="load tasks and review history from a snapshot, "
+                                                  "replacing tasks with the same ids")
+    restore.add_argument('path', help="a .blsnap file exported from the task list")
+    restore.set_defaults(handler=command_restore)
+
+    stats = commands.add_parser('stats', help="show deck counters")
+    stats.add_argument('--json', action='store_true')
+    stats.set_defaults(handler=command_stats)
+
+    sync = commands.add_parser('sync', help="exchange changed tasks and reviews with a sync server")
+    sync.add_argument('url', help="server address, e.g. http://127.0.0.1:8765")
+    sync.set_defaults(handler=command_sync)
+
+    decks = commands.add_parser('decks', help="list decks with their due counts")
+    decks.add_argument('--new', metavar='NAME', help="create an empty deck instead")
+    decks.set_defaults(handler=command_decks)
+
+    maintain = commands.add_parser('maintain', help="check integrity and compact every deck in parallel")
+    maintain.add_argument('--reschedule', action='store_true',
+                          help="also re-plan every task, scaling its interval to the parameters below")
+    maintain.add_argument('--interval-modifier', type=float, help="factor on every grown interval (default: 1.0)")
+    maintain.add_argument('--max-interval', type=float, help="longest interval in days (default: 36500)")
+    maintain.add_argument('--workers', type=int, help="processes to use (default: one per core)")
+    maintain.set_defaults(handler=command_maintain)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.decks = DeckManager(args.db)
+    path = args.db
+    if args.deck:
+        try:
+            deck = args.decks.get(args.deck)
+        except ValueError as error:
+            raise SystemExit(str(error))
+        if not os.path.exists(deck.path):
+            raise SystemExit(f"No deck named {args.deck!r}; create it with: decks --new NAME")
+        path = deck.path
+    store = TaskStore(path)
+    try:
+        args.handler(store, args)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Decks stored as separate task databases ("shards"), with cross-deck work spread over processes
+
+The Default deck is the original task database; every other deck is decks/<name>.db next to it.
+Deck-wide jobs take a database path, open their own store and return a small picklable result,
+so a ProcessPoolExecutor can run one deck per core and the results are merged by deck name.
+
+Spawned workers import the parent's main module again, so only the command line fans out to
+processes: cli.py never imports tkinter, while the GUI's main module would pull in the whole
+window. The GUI keeps workers=1 and runs jobs on a thread of its own process.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import re
+import time
+from task_store import DAY, DEFAULT_DB_PATH, TaskFilter, TaskStore, day_start
+
+DEFAULT_DECK = 'Default'
+DECK_NAME = re.compile(r'^\w[\w \-]{0,63}$')
+
+
+def deck_summary(path, due_before):
+    """Return (tasks, due before due_before) for one deck"""
+    store = TaskStore(path)
+    try:
+        return store.count(), store.count_filtered(TaskFilter(due_before=due_before))
+    finally:
+        store.close()
+
+
+def deck_check(path):
+    """Return the integrity problems SQLite reports for one deck (an empty list when healthy)"""
+    store = TaskStore(path)
+    try:
+        conn = store.connection()
+        problems = [row[0] for row in conn.execute('PRAGMA quick_check') if row[0] != 'ok']
+        problems.extend(f'foreign key violation in {row[0]}' for row in conn.execute('PRAGMA foreign_key_check'))
+        return problems
+    finally:
+        store.close()
+
+
+def deck_compact(path):
+    """Fold the deck's review journal into the database and shrink its write-ahead log
+
+    Returns the number of reviews folded; 0 for a deck whose journal another process owns, as
+    that process compacts it itself.
+    """
+    from journal import ReviewJournal, journal_path_for
+
+    store = TaskStore(path)
+    try:
+        folded = ReviewJournal(journal_path_for(path)).compact(store)
+        conn = store.connection()
+        conn.execute('PRAGMA optimize')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return folded
+    finally:
+        store.close()
+
+
+def deck_reschedule(path, params):
+    """Re-plan every task of the deck with new SM-2 parameters; returns the task count"""
+    from intervals import reschedule_store
+
+    store = TaskStore(path)
+    try:
+        return reschedule_store(store, params)
+    finally:
+        store.close()
+
+
+class Deck:
+    """A named deck and the database file that stores it"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    def open(self):
+        return TaskStore(self.path)
+
+    def __repr__(self):
+        return f'Deck({self.name!r}, {self.path!r})'
+
+
+class DeckManager:
+    """Finds, creates and selects decks, and runs jobs over all of them in parallel"""
+
+    def __init__(self, default_path=DEFAULT_DB_PATH, workers=None):
+        self.default_path = default_path
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(default_path)), 'decks')
+        self.workers = workers or os.cpu_count() or 1
+        self._current_file = os.path.join(self.directory, 'current')
+
+    def decks(self):
+        """Return every deck, Default first and the others by name"""
+        names = []
+        if os.path.isdir(self.directory):
+            names = sorted((entry[:-3] for entry in os.listdir(self.directory)
+                            if entry.endswith('.db') and DECK_NAME.match(entry[:-3])), key=str.casefold)
+        return [Deck(DEFAULT_DECK, self.default_path)] + [self.get(name) for name in names]
+
+    def get(self, name):
+        """Return the deck with this name (its database may not exist yet)"""
+        if name == DEFAULT_DECK:
+            return Deck(DEFAULT_DECK, self.default_path)
+        if not DECK_NAME.match(name):
+            raise ValueError(f"Invalid deck name {name!r}: use letters, digits, spaces, '-' and '_'")
+        return Deck(name, os.path.join(self.directory, f'{name}.db'))
+
+    def create(self, name):
+        """Create an empty deck and return it"""
+        name = name.strip()
+        deck = self.get(name)
+        if name == DEFAULT_DECK or os.path.exists(deck.path):
+            raise ValueError(f"A deck named {name!r} already exists")
+        deck.open().close()
+        return deck
+
+    def current(self):
+        """Return the deck selected last, falling back to Default"""
+        try:
+            with open(self._current_file, encoding='utf-8') as current_file:
+                deck = self.get(current_file.read().strip())
+        except (OSError, ValueError):
+            return self.get(DEFAULT_DECK)
+        return deck if deck.name == DEFAULT_DECK or os.path.exists(deck.path) else self.get(DEFAULT_DECK)
+
+    def select(self, name):
+        """Remember the deck to open next time"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._current_file, 'w', encoding='utf-8') as current_file:
+            current_file.write(self.get(name).name)
+
+    def fan_out(self, job, *args, decks=None):
+        """Run job(deck path, *args) for every deck on a process pool; returns {deck name: result}
+
+        A job that raises leaves its exception as the deck's result, so one broken deck does not
+        hide the others. A single deck, or workers=1, runs in the calling process.
+        """
+        decks = self.decks() if decks is None else list(decks)
+        if len(decks) <= 1 or self.workers <= 1:
+            return {deck.name: self._run(job, deck.path, *args) for deck in decks}
+
+        # spawn: forking a process with threads could copy locks they hold
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(min(len(decks), self.workers), mp_context=context) as pool:
+            futures = {deck.name: pool.submit(job, deck.path, *args) for deck in decks}
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as error:
+                    results[name] = error
+            return results
+
+    @staticmethod
+    def _run(job, *args):
+        try:
+            return job(*args)
+        except Exception as error:
+            return error
+
+    def summaries(self, decks=None, now=None):
+        """Return {deck name: (tasks, due today)}"""
+        now = time.time() if now is None else now
+        return self.fan_out(deck_summary, day_start(now) + DAY, decks=decks)
+
+    def check(self, decks=None):
+        """Return {deck name: [integrity problems]}"""
+        return self.fan_out(deck_check, decks=decks)
+
+    def compact(self, decks=None):
+        """Return {deck name: reviews folded from the journal}"""
+        return self.fan_out(deck_compact, decks=decks)
+
+    def reschedule(self, params, decks=None):
+        """Return {deck name: tasks re-planned with params}"""
+        return self.fan_out(deck_reschedule, params, decks=decks)
@@ -0,0 +1,155 @@
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from instrumentation import METRICS
+from theme import COLORS, setup_theme
+
+
+class DiagnosticsPanel:
+    """Hidden window listing hot-path latencies; opened with Ctrl+Shift+D or a double click on "Actions" """
+
+    def __init__(self, main_root, watchdog, metrics=METRICS):
+        self.main_root = main_root
+        self.watchdog = watchdog
+        self.metrics = metrics
+        self.recording = tk.BooleanVar(value=metrics.enabled)
+        self._refresh_id = None
+
+        self.root = tk.Toplevel(main_root)
+        self.root.title("Diagnostics")
+        self.root.transient(main_root)
+        self.root.protocol('WM_DELETE_WINDOW', self.close_window)
+
+        self.colors = COLORS
+
+        self.root.configure(bg=self.colors['bg'])
+        setup_theme(self.root)
+        self.center_window(700, 450)
+        self.create_window_style()
+
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'{width}x{height}+{x}+{y}')
+
+    def create_window_style(self):
+        """Build the latency table and the controls"""
+        main_container = ttk.Frame(self.root, style='Card.TFrame')
+        main_container.pack(fill='both', expand=True, padx=20, pady=20)
+
+        title_label = ttk.Label(main_container, text="Diagnostics", style='WindowTitle.TLabel')
+        title_label.pack(anchor='w')
+
+        self.lag_label = ttk.Label(main_container, text="", style='Normal.TLabel')
+        self.lag_label.pack(anchor='w', pady=(0, 10))
+
+        self.table = ttk.Treeview(main_container, style='Custom.Treeview', show='headings', height=12)
+        self.table['columns'] = ('Metric', 'Count', 'p50 ms', 'p99 ms', 'Max ms')
+        for column in self.table['columns']:
+            self.table.heading(column, text=column, anchor='center')
+            self.table.column(column, width=90, anchor='center')
+        self.table.column('Metric', width=250, anchor='w')
+        self.table.pack(fill='both', expand=True)
+
+        self.long_task_label = ttk.Label(main_container, text="", style='Normal.TLabel')
+        self.long_task_label.pack(anchor='w', pady=(10, 0))
+
+        button_frame = ttk.Frame(main_container, style='Card.TFrame')
+        button_frame.pack(fill='x', pady=(10, 0))
+
+        record_check = ttk.Checkbutton(
+            button_frame,
+            text="Record",
+            variable=self.recording,
+            command=self.toggle_recording
+        )
+        record_check.pack(side='left')
+
+        save_button = ttk.Button(
+            button_frame,
+            text="Save profile…",
+            style='Success.TButton',
+            command=self.save_profile,
+            cursor='hand2'
+        )
+        save_button.pack(side='right')
+
+        reset_button = ttk.Button(
+            button_frame,
+            text="Reset",
+            style='Danger.TButton',
+            command=self.reset_metrics,
+            cursor='hand2'
+        )
+        reset_button.pack(side='right', padx=10)
+
+    def toggle_recording(self):
+        """Turn metric recording on or off with the checkbox"""
+        self.metrics.enable(self.recording.get())
+
+    def reset_metrics(self):
+        """Clear the collected metrics and redraw the table"""
+        self.metrics.reset()
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the table from the current metrics"""
+        summary = self.metrics.summary()
+        counters = self.metrics.counters()
+        self.table.delete(*self.table.get_children(''))
+        for name, values in summary.items():
+            self.table.insert('', 'end', values=(name, values['count'], f"{values['p50']:.2f}",
+                                                 f"{values['p99']:.2f}", f"{values['max']:.2f}"))
+        for name, value in sorted(counters.items()):
+            self.table.insert('', 'end', values=(name, value, '', '', ''))
+
+        lag = summary.get('tk.loop_lag')
+        if lag is not None:
+            self.lag_label.configure(text=f"Event loop lag: now {self.watchdog.last_lag:.1f} ms, "
+                                          f"p50 {lag['p50']:.1f} ms, p99 {lag['p99']:.1f} ms")
+        if self.watchdog.reports:
+            last = self.watchdog.reports[-1]
+            self.long_task_label.configure(text=f"{len(self.watchdog.reports)} blocking callback(s); "
+                                                f"last {last.duration:.0f} ms in {last.location}")
+        self._refresh_id = self.root.after(1000, self.refresh)
+
+    def save_profile(self):
+        """Write the metrics to a JSON file chosen by the user"""
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Save profile",
+            defaultextension='.json',
+            initialfile=time.strftime('better-learning-profile-%Y%m%d-%H%M%S.json'),
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            self.metrics.dump(path, {'long_tasks': [task.as_dict() for task in self.watchdog.reports]})
+        except OSError as error:
+            messagebox.showerror("Save failed", str(error), parent=self.root)
+
+    def show(self):
+        """Show the panel and start recording"""
+        self.metrics.enable()
+        self.recording.set(True)
+        self.root.deiconify()
+        self.root.lift()
+        if self._refresh_id is None:
+            self.refresh()
+
+    def hide(self):
+        """Hide the panel; recording continues until it is switched off"""
+        if self._refresh_id is not None:
+            self.root.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        self.root.withdraw()
+
+    def reset(self):
+        """Nothing to clear for a reused panel"""
+        pass
+
+    def close_window(self):
+        """Hide the panel"""
+        self.hide()
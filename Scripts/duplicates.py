@@ -0,0 +1,183 @@
+import threading
+import zlib
+import numpy as np
+from search_index import tokenize
+
+NUM_PERM = 32
+BANDS = 8
+SIMILARITY = 0.5
+
+# Multiply-shift hash family: odd 64-bit multipliers, the high 32 bits of the product are the hash
+_RNG = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _RNG.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _RNG.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _RNG.integers(1, 2 ** 63, size=NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+_SHIFT = np.uint64(32)
+
+
+def normalize(name, description=''):
+    """Lowercase words of a task separated by single spaces, padded so every task has shingles"""
+    return '  ' + ' '.join(tokenize(f'{name} {description}')) + '  '
+
+
+def signatures(texts):
+    """MinHash signatures (len(texts) x NUM_PERM, uint32) over the byte 3-grams of each text"""
+    encoded = [text.encode('utf-8') for text in texts]
+    lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    shingles = (buffer[:-2] << np.uint64(16)) | (buffer[1:-1] << np.uint64(8)) | buffer[2:]
+
+    # Drop the 3-grams that start in the last two bytes of a text and run into the next one
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    valid = np.ones(len(shingles), dtype=bool)
+    valid[np.concatenate((ends[:-1] - 2, ends[:-1] - 1))] = False
+    shingles = shingles[valid]
+    offsets = starts - 2 * np.arange(len(starts))
+
+    result = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for permutation in range(NUM_PERM):
+        hashes = (shingles * _MULTIPLIERS[permutation] + _OFFSETS[permutation]) >> _SHIFT
+        result[:, permutation] = np.minimum.reduceat(hashes, offsets)
+    return result
+
+
+def band_keys(signature_rows):
+    """One 64-bit key per band (len x BANDS) for LSH bucketing"""
+    rows = signature_rows.astype(np.uint64).reshape(len(signature_rows), BANDS, NUM_PERM // BANDS)
+    return (rows * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+class DuplicateIndex:
+    """MinHash/LSH index that finds tasks whose name and description nearly match a text
+
+    Each task gets a signature of NUM_PERM min-hashes over the 3-grams of its words, split into
+    BANDS bands; tasks sharing any band are candidates and are ranked by the share of equal
+    min-hashes, an estimate of the Jaccard similarity of their 3-grams. Bulk builds keep the band
+    keys in sorted NumPy arrays; tasks added later go to a small dict until the next rebuild.
+    """
+
+    def __init__(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self._checksums = np.empty(0, dtype=np.uint32)
+        self._size = 0
+        self._rows = {}
+        self._sorted_keys = np.empty((BANDS, 0), dtype=np.uint64)
+        self._sorted_rows = np.empty((BANDS, 0), dtype=np.int64)
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store):
+        """Build an index over every task in the store"""
+        index = cls()
+        index.build(store)
+        return index
+
+    def build(self, store, chunk_size=5000):
+        """Index every task of the store, hashing in chunks and sorting the band keys once"""
+        cursor = store.all_tasks()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            self.add_many(rows, bucket=False)
+        self._freeze()
+
+    def rebuild(self, store):
+        """Re-index the whole store, swapping the new index in when it is complete"""
+        fresh = DuplicateIndex.from_store(store)
+        with self._lock:
+            self._ids = fresh._ids
+            self._signatures = fresh._signatures
+            self._checksums = fresh._checksums
+            self._size = fresh._size
+            self._rows = fresh._rows
+            self._sorted_keys = fresh._sorted_keys
+            self._sorted_rows = fresh._sorted_rows
+            self._recent = fresh._recent
+
+    def add_many(self, rows, bucket=True):
+        """Index store rows (id, name, description, ...); rows whose text did not change are skipped
+
+        With bucket=False the band keys are left for the next _freeze, which is how bulk builds
+        avoid a dict entry per band and task.
+        """
+        rows = list(rows)
+        texts = [normalize(row[1], row[2]) for row in rows]
+        checksums = [zlib.crc32(text.encode('utf-8')) for text in texts]
+        with self._lock:
+            changed = [position for position, row in enumerate(rows)
+                       if self._rows.get(row[0]) is None or self._checksums[self._rows[row[0]]] != checksums[position]]
+        if not changed:
+            return
+        new_signatures = signatures([texts[position] for position in changed])
+        new_keys = band_keys(new_signatures) if bucket else None
+
+        with self._lock:
+            self._reserve(len(changed))
+            for index, position in enumerate(changed):
+                task_id = rows[position][0]
+                row = self._rows.get(task_id)
+                if row is None:
+                    row = self._rows[task_id] = self._size
+                    self._ids[row] = task_id
+                    self._size += 1
+                # Keys of the old text stay behind; candidates are checked against the current signature
+                self._signatures[row] = new_signatures[index]
+                self._checksums[row] = checksums[position]
+                if bucket:
+                    for band, key in enumerate(new_keys[index].tolist()):
+                        self._recent.setdefault((band, key), []).append(row)
+
+    def on_store_change(self, event, rows):
+        """Store subscriber that keeps the index current"""
+        if event in ('add', 'update'):
+            self.add_many(rows)
+
+    def __len__(self):
+        return self._size
+
+    def similar(self, name, description='', threshold=SIMILARITY, limit=3):
+        """Return up to `limit` (similarity, task_id) pairs at or above threshold, most similar first"""
+        signature = signatures([normalize(name, description)])
+        keys = band_keys(signature)[0]
+        with self._lock:
+            buckets = []
+            for band, key in enumerate(keys):
+                sorted_keys = self._sorted_keys[band]
+                start = sorted_keys.searchsorted(key, 'left')
+                end = sorted_keys.searchsorted(key, 'right')
+                buckets.append(self._sorted_rows[band, start:end])
+                buckets.append(np.asarray(self._recent.get((band, int(key)), ()), dtype=np.int64))
+            rows = np.unique(np.concatenate(buckets))
+            if not len(rows):
+                return []
+            scores = (self._signatures[rows] == signature).mean(axis=1)
+            ids = self._ids[rows]
+        keep = np.flatnonzero(scores >= threshold)
+        best = keep[np.argsort(-scores[keep], kind='stable')[:limit]]
+        return [(float(scores[position]), int(ids[position])) for position in best]
+
+    def _reserve(self, count):
+        needed = self._size + count
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        signatures_ = np.empty((capacity, NUM_PERM), dtype=np.uint32)
+        signatures_[:self._size] = self._signatures[:self._size]
+        checksums = np.empty(capacity, dtype=np.uint32)
+        checksums[:self._size] = self._checksums[:self._size]
+        self._ids, self._signatures, self._checksums = ids, signatures_, checksums
+
+    def _freeze(self):
+        """Move every band key into the sorted arrays"""
+        with self._lock:
+            keys = band_keys(self._signatures[:self._size]).T
+            order = np.argsort(keys, axis=1, kind='stable')
+            self._sorted_keys = np.take_along_axis(keys, order, axis=1)
+            self._sorted_rows = order
+            self._recent = {}
@@ -0,0 +1,262 @@
+import csv
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+EXPORT_COLUMNS = ('id', 'name', 'description', 'created', 'next_review', 'repeated',
+                  'interval', 'ease', 'last_review', 'uid', 'modified', 'origin')
+HISTORY_COLUMNS = ('seq', 'task_id', 'kind', 'grade', 'ts')
+
+SNAPSHOT_MAGIC = b'BLSNAP01'
+SNAPSHOT_HEADER = struct.Struct('<8s1sxxxIQQ')
+SNAPSHOT_ENTRY = struct.Struct('<16s4sQQ')
+BYTE_ORDER = b'L' if sys.byteorder == 'little' else b'B'
+
+# Snapshot columns: name -> array typecode; text columns are stored as offsets + utf-8 data.
+# NaN stands for a missing number and an empty string for a missing uid or origin. Snapshots
+# written before sync have no uid, modified and origin columns
+TASK_NUMERIC = (('id', 'q'), ('created', 'd'), ('next_review', 'd'), ('repeated', 'q'),
+                ('interval', 'd'), ('ease', 'd'), ('last_review', 'd'), ('modified', 'd'))
+TASK_TEXT = ('name', 'description', 'uid', 'origin')
+HISTORY_NUMERIC = (('seq', 'q'), ('task_id', 'q'), ('kind', 'b'), ('grade', 'b'), ('ts', 'd'))
+EVENT_KINDS = ('create', 'review')
+
+FLUSH_ROWS = 4096
+
+
+def history_path_for(path):
+    """Return the companion file holding review history for a CSV export"""
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.history{extension or ".csv"}'
+
+
+def export_csv(store, path, progress=None):
+    """Stream tasks to a CSV file and their review history to a companion CSV file"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as tasks_file:
+        writer = csv.writer(tasks_file)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in store.export_tasks():
+            writer.writerow(row)
+            count += 1
+            if progress is not None and count % FLUSH_ROWS == 0:
+                progress(count)
+
+    with open(history_path_for(path), 'w', newline='', encoding='utf-8') as history_file:
+        writer = csv.writer(history_file)
+        writer.writerow(HISTORY_COLUMNS)
+        writer.writerows(store.review_history())
+    return count
+
+
+def export_jsonl(store, path, progress=None):
+    """Stream tasks and review events to a JSON Lines file, one record per line"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as jsonl_file:
+        for row in store.export_tasks():
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record['type'] = 'task'
+            jsonl_file.write(json.dumps(record, ensure_ascii=False))
+            jsonl_file.write('\n')
+            count += 1
+            if progress is not None and count % FLUSH_ROWS == 0:
+                progress(count)
+
+        for row in store.review_history():
+            record = dict(zip(HISTORY_COLUMNS, row))
+            record['type'] = 'review'
+            jsonl_file.write(json.dumps(record))
+            jsonl_file.write('\n')
+    return count
+
+
+class ColumnWriter:
+    """Spools one snapshot column to a temporary file in fixed-size chunks"""
+
+    def __init__(self, name, typecode, directory):
+        self.name = name
+        self.typecode = typecode
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.buffer = array(typecode)
+
+    def append(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+
+    def size(self):
+        self.flush()
+        return self.file.tell()
+
+
+class TextColumnWriter:
+    """Spools a text column as an offsets column plus a utf-8 data column"""
+
+    def __init__(self, name, directory):
+        self.offsets = ColumnWriter(f'{name}.off', 'q', directory)
+        self.data = ColumnWriter(f'{name}.dat', 'B', directory)
+        self.position = 0
+        self.offsets.append(0)
+
+    def append(self, text):
+        encoded = text.encode('utf-8')
+        self.data.file.write(encoded)
+        self.position += len(encoded)
+        self.offsets.append(self.position)
+
+    def columns(self):
+        return [self.offsets, self.data]
+
+
+def export_snapshot(store, path, progress=None):
+    """Write tasks and history to a columnar snapshot that can be memory-mapped
+
+    Each column is spooled to its own temporary file while the rows stream past, then the
+    columns are concatenated behind a small header, so memory use does not grow with the deck.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    task_numeric = [ColumnWriter(name, typecode, directory) for name, typecode in TASK_NUMERIC]
+    task_text = [TextColumnWriter(name, directory) for name in TASK_TEXT]
+    history = [ColumnWriter(f'h.{name}', typecode, directory) for name, typecode in HISTORY_NUMERIC]
+
+    count = 0
+    for (task_id, name, description, created, next_review, repeated, interval, ease, last_review,
+         uid, modified, origin) in store.export_tasks():
+        values = (task_id, created, next_review, repeated, interval, ease,
+                  math.nan if last_review is None else last_review, math.nan if modified is None else modified)
+        for writer, value in zip(task_numeric, values):
+            writer.append(value)
+        for writer, text in zip(task_text, (name, description, uid or '', origin or '')):
+            writer.append(text)
+        count += 1
+        if progress is not None and count % FLUSH_ROWS == 0:
+            progress(count)
+
+    history_count = 0
+    for seq, task_id, kind, grade, ts in store.review_history():
+        values = (seq, task_id, EVENT_KINDS.index(kind), -1 if grade is None else grade, ts)
+        for writer, value in zip(history, values):
+            writer.append(value)
+        history_count += 1
+
+    columns = task_numeric + [column for text in task_text for column in text.columns()] + history
+    sizes = [column.size() for column in columns]
+
+    offset = SNAPSHOT_HEADER.size + SNAPSHOT_ENTRY.size * len(columns)
+    entries = []
+    for column, size in zip(columns, sizes):
+        offset += -offset % 8
+        entries.append((column, offset, size))
+        offset += size
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as snapshot_file:
+        snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, BYTE_ORDER, len(columns), count, history_count))
+        for column, column_offset, size in entries:
+            snapshot_file.write(SNAPSHOT_ENTRY.pack(column.name.encode('ascii'), column.typecode.encode('ascii'),
+                                                    column_offset, size))
+        for column, column_offset, size in entries:
+            snapshot_file.write(b'\0' * (column_offset - snapshot_file.tell()))
+            column.file.seek(0)
+            shutil.copyfileobj(column.file, snapshot_file)
+            column.file.close()
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary, path)
+    return count
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot written by export_snapshot"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, column_count, self.count, self.history_count = SNAPSHOT_HEADER.unpack_from(self._map)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a Better Learning snapshot")
+        if byte_order != BYTE_ORDER:
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+
+        self._view = memoryview(self._map)
+        self._columns = {}
+        for index in range(column_count):
+            name, typecode, offset, size = SNAPSHOT_ENTRY.unpack_from(self._map, SNAPSHOT_HEADER.size + index * SNAPSHOT_ENTRY.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            typecode = typecode.rstrip(b'\0').decode('ascii')
+            self._columns[name] = self._view[offset:offset + size].cast(typecode)
+
+    def column(self, name):
+        """Return a zero-copy memoryview of a numeric column (wrap with numpy.frombuffer if needed)"""
+        return self._columns[name]
+
+    def text(self, name, index):
+        """Decode one value of a text column"""
+        offsets = self._columns[f'{name}.off']
+        return bytes(self._columns[f'{name}.dat'][offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def tasks(self):
+        """Iterate over full task rows in export column order; sync columns are None when missing"""
+        numeric = [self._columns[name] for name, _ in TASK_NUMERIC[:-1]]
+        synced = 'uid.off' in self._columns
+        for index in range(self.count):
+            task_id, created, next_review, repeated, interval, ease, last_review = (column[index] for column in numeric)
+            row = (task_id, self.text('name', index), self.text('description', index), created, next_review,
+                   repeated, interval, ease, None if math.isnan(last_review) else last_review)
+            if not synced:
+                yield row + (None, None, None)
+                continue
+            modified = self._columns['modified'][index]
+            yield row + (self.text('uid', index) or None, None if math.isnan(modified) else modified,
+                         self.text('origin', index) or None)
+
+    def history(self):
+        """Iterate over review history rows"""
+        columns = [self._columns[f'h.{name}'] for name, _ in HISTORY_NUMERIC]
+        for index in range(self.history_count):
+            seq, task_id, kind, grade, ts = (column[index] for column in columns)
+            yield seq, task_id, EVENT_KINDS[kind], None if grade < 0 else grade, ts
+
+    def close(self):
+        """Release the memory map"""
+        for view in self._columns.values():
+            view.release()
+        self._columns.clear()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+def restore_snapshot(store, path):
+    """Load a snapshot into the store, replacing tasks with the same ids; returns the task count"""
+    snapshot = Snapshot(path)
+    try:
+        store.restore(snapshot.tasks(), snapshot.history())
+        return snapshot.count
+    finally:
+        snapshot.close()
+
+
+EXPORTERS = {
+    '.csv': export_csv,
+    '.jsonl': export_jsonl,
+    '.blsnap': export_snapshot
+}
+
+
+def export_file(store, path, progress=None):
+    """Export the deck in the format given by the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError(f"Unsupported export format '{extension}'")
+    return EXPORTERS[extension](store, path, progress)
@@ -0,0 +1,191 @@
+import csv
+import html
+import itertools
+import os
+import re
+import time
+from task_store import DAY, FIRST_INTERVAL, name_hash
+
+MAX_NAME_LENGTH = 500
+MAX_DESCRIPTION_LENGTH = 20000
+
+# Page cache used while importing, so index pages stay in memory between batches
+BULK_CACHE_KIB = 65536
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+BREAK_PATTERN = re.compile(r'<br\s*/?>|</div>|</p>', re.IGNORECASE)
+
+# Separator names used by Anki's "#separator:" header
+ANKI_SEPARATORS = {
+    'tab': '\t',
+    'comma': ',',
+    'semicolon': ';',
+    'space': ' ',
+    'pipe': '|',
+    'colon': ':'
+}
+
+# Anki header columns that do not hold card text
+ANKI_META_COLUMNS = ('guid', 'notetype', 'deck', 'tags')
+
+HEADER_NAMES = ('name', 'task name', 'front', 'question', 'term')
+
+
+class ImportStats:
+    """Counters reported while a deck is being imported"""
+
+    def __init__(self, total_bytes=0):
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.started = time.perf_counter()
+        self.finished = False
+        self.cancelled = False
+
+    @property
+    def fraction(self):
+        """Share of the file consumed so far, between 0 and 1"""
+        return self.bytes_read / self.total_bytes if self.total_bytes else 0.0
+
+    @property
+    def rows_per_second(self):
+        """Average parsing speed"""
+        elapsed = time.perf_counter() - self.started
+        return self.rows_read / elapsed if elapsed > 0 else 0.0
+
+
+def counted_lines(binary_file, stats):
+    """Decode lines from a binary file while counting the bytes consumed"""
+    first = True
+    for raw in binary_file:
+        stats.bytes_read += len(raw)
+        if first:
+            first = False
+            yield raw.decode('utf-8-sig', errors='replace')
+        else:
+            yield raw.decode('utf-8', errors='replace')
+
+
+def strip_html(text):
+    """Turn Anki HTML field content into plain text"""
+    text = BREAK_PATTERN.sub('\n', text)
+    return html.unescape(TAG_PATTERN.sub('', text)).strip()
+
+
+def read_anki_header(lines):
+    """Consume Anki '#key:value' header lines; return (options, first data line or None)"""
+    options = {}
+    for line in lines:
+        if not line.startswith('#'):
+            return options, line
+        key, _, value = line[1:].rstrip('\r\n').partition(':')
+        options[key.strip().lower()] = value.strip()
+    return options, None
+
+
+def parse_rows(lines, path):
+    """Yield (name, description) pairs from CSV, TSV or Anki text export lines"""
+    options, first_line = read_anki_header(lines)
+    if first_line is None:
+        return
+
+    delimiter = ',' if path.lower().endswith('.csv') else '\t'
+    if 'separator' in options:
+        value = options['separator']
+        delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or delimiter)
+    is_html = options.get('html', 'false').lower() == 'true'
+
+    skip = set()
+    for column in ANKI_META_COLUMNS:
+        value = options.get(f'{column} column')
+        if value and value.isdigit():
+            skip.add(int(value) - 1)
+
+    def all_lines():
+        yield first_line
+        yield from lines
+
+    header_checked = bool(options)
+    for fields in csv.reader(all_lines(), delimiter=delimiter):
+        if skip:
+            fields = [field for index, field in enumerate(fields) if index not in skip]
+        if not header_checked:
+            header_checked = True
+            if fields and fields[0].strip().lower() in HEADER_NAMES:
+                continue
+        if not fields:
+            continue
+        name = fields[0]
+        description = fields[1] if len(fields) > 1 else ''
+        if is_html:
+            name, description = strip_html(name), strip_html(description)
+        yield name, description
+
+
+def validated(pairs, stats):
+    """Drop rows without a name or with oversized fields"""
+    for name, description in pairs:
+        stats.rows_read += 1
+        name = name.strip()
+        description = description.strip()
+        if not name or len(name) > MAX_NAME_LENGTH or len(description) > MAX_DESCRIPTION_LENGTH:
+            stats.invalid += 1
+            continue
+        yield name, description
+
+
+def batched(rows, batch_size):
+    """Group an iterator into lists of batch_size items"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_file(store, path, batch_size=50000, progress=None, cancel=None, now=None):
+    """Stream a deck file into the store in transactional batches
+
+    Rows are deduplicated by name hash against the file itself and the tasks already stored.
+    progress(stats) is called after every batch but the last, then once with the final state;
+    setting the cancel event stops after the current batch. Returns the final ImportStats.
+    """
+    now = time.time() if now is None else now
+    next_review = now + FIRST_INTERVAL * DAY
+    stats = ImportStats(os.path.getsize(path))
+
+    store.set_cache_size(BULK_CACHE_KIB)
+    try:
+        with open(path, 'rb') as deck_file:
+            pairs = validated(parse_rows(counted_lines(deck_file, stats), path), stats)
+            for batch in batched(pairs, batch_size):
+                keyed = {}
+                for name, description in batch:
+                    key = name_hash(name)
+                    if key in keyed:
+                        stats.duplicates += 1
+                    else:
+                        keyed[key] = (name, description, now, next_review, key)
+
+                existing = store.existing_name_hashes(keyed)
+                stats.duplicates += len(existing)
+                stats.imported += store.insert_many(row for key, row in keyed.items() if key not in existing)
+
+                # The batch that consumed the file is reported once, below, as the final state
+                if progress is not None and stats.bytes_read < stats.total_bytes:
+                    progress(stats)
+                if cancel is not None and cancel.is_set():
+                    stats.cancelled = True
+                    break
+    finally:
+        store.set_cache_size()
+    stats.finished = True
+    if stats.imported:
+        store.notify('import', [])
+    if progress is not None:
+        progress(stats)
+    return stats
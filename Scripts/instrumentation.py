@@ -0,0 +1,152 @@
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+
+class _NullTimer:
+    """Timer handed out while instrumentation is off; entering and leaving it does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Metrics:
+    """Latency samples and counters for the hot paths
+
+    While disabled, timers and counters cost one attribute check. Each latency keeps the last
+    `capacity` samples in a ring buffer, so memory stays bounded however long the app runs.
+    """
+
+    def __init__(self, capacity=2048, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.started = time.time()
+        self._samples = {}
+        self._totals = collections.Counter()
+        self._counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        """Start or stop recording samples"""
+        self.enabled = enabled
+
+    def reset(self):
+        """Forget every sample and counter"""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def timer(self, name):
+        """Context manager that records how long its block took in milliseconds"""
+        return _Timer(self, name) if self.enabled else NULL_TIMER
+
+    def timed(self, name):
+        """Decorator recording the duration of every call while enabled"""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter() - start) * 1000)
+            return wrapper
+        return decorate
+
+    def record(self, name, milliseconds):
+        """Add one latency sample"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = collections.deque(maxlen=self.capacity)
+            samples.append(milliseconds)
+            self._totals[name] += 1
+
+    def count(self, name, amount=1):
+        """Increase a counter while enabled"""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += amount
+
+    def summary(self):
+        """Return {name: {count, p50, p99, max}} for latencies, milliseconds over recent samples"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            totals = dict(self._totals)
+        result = {}
+        for name, ordered in sorted(snapshot.items()):
+            if not ordered:
+                continue
+            result[name] = {
+                'count': totals[name],
+                'p50': ordered[len(ordered) // 2],
+                'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                'max': ordered[-1]
+            }
+        return result
+
+    def counters(self):
+        """Return a copy of every counter"""
+        with self._lock:
+            return dict(self._counters)
+
+    def dump(self, path, extra=None):
+        """Write latencies, counters, raw recent samples and current thread stacks to a JSON file
+
+        extra holds further JSON-ready sections, e.g. the watchdog's long tasks.
+        """
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = {
+            names.get(ident, str(ident)): traceback.format_stack(frame)
+            for ident, frame in sys._current_frames().items()
+        }
+        profile = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'recording_since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'pid': os.getpid(),
+            'python': sys.version,
+            'latency_ms': self.summary(),
+            'counters': self.counters(),
+            'samples_ms': samples,
+            'threads': stacks
+        }
+        profile.update(extra or {})
+        with open(path, 'w', encoding='utf-8') as profile_file:
+            json.dump(profile, profile_file, indent=2)
+
+
+# Shared by every module; set BETTER_LEARNING_METRICS=1 to record from startup
+METRICS = Metrics(enabled=os.environ.get('BETTER_LEARNING_METRICS') == '1')
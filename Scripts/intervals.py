@@ -0,0 +1,107 @@
+import numpy as np
+from task_store import DAY
+
+
+class SM2Parameters:
+    """Tunable constants of the SM-2 spaced repetition algorithm"""
+
+    def __init__(self, first_interval=1.0, second_interval=6.0, initial_ease=2.5,
+                 min_ease=1.3, interval_modifier=1.0, max_interval=36500.0):
+        self.first_interval = first_interval
+        self.second_interval = second_interval
+        self.initial_ease = initial_ease
+        self.min_ease = min_ease
+        self.interval_modifier = interval_modifier
+        self.max_interval = max_interval
+
+
+DEFAULT_PARAMETERS = SM2Parameters()
+
+# Dtype of the arrays returned by load_schedule_state
+STATE_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('ease', np.float64),
+    ('interval', np.float64),
+    ('repeated', np.int32),
+    ('next_review', np.float64),
+])
+
+
+def next_ease(ease, grade, params=DEFAULT_PARAMETERS):
+    """Return the ease factor after a review graded 0-5 (works on scalars and arrays)"""
+    miss = 5 - grade
+    return np.maximum(params.min_ease, ease + 0.1 - miss * (0.08 + miss * 0.02))
+
+
+def review(ease, interval, repeated, grade, params=DEFAULT_PARAMETERS):
+    """Apply one graded review to a single card and return (ease, interval, repeated)"""
+    if grade < 3:
+        repeated = 0
+        interval = params.first_interval
+    else:
+        repeated += 1
+        if repeated == 1:
+            interval = params.first_interval
+        elif repeated == 2:
+            interval = params.second_interval
+        else:
+            interval = interval * ease * params.interval_modifier
+    interval = min(interval, params.max_interval)
+    return float(next_ease(ease, grade, params)), interval, repeated
+
+
+def review_batch(ease, interval, repeated, grade, params=DEFAULT_PARAMETERS):
+    """Apply one graded review to every card of the arrays at once"""
+    passed = grade >= 3
+    new_repeated = np.where(passed, repeated + 1, 0)
+    grown = interval * ease * params.interval_modifier
+    new_interval = np.where(new_repeated <= 1, params.first_interval,
+                            np.where(new_repeated == 2, params.second_interval, grown))
+    np.minimum(new_interval, params.max_interval, out=new_interval)
+    return next_ease(ease, grade, params), new_interval, new_repeated
+
+
+def plan_intervals(interval, repeated, params=DEFAULT_PARAMETERS, old_params=DEFAULT_PARAMETERS):
+    """Re-plan intervals in days that were planned with old_params
+
+    Under SM-2 an interval is the first interval until the second pass, then the second interval
+    times one ease factor and interval modifier per later pass. The eases come from the review
+    history and stay, so each interval is scaled by the ratio of the parameters it was built from;
+    with unchanged parameters every interval is returned as it was.
+    """
+    exponent = np.maximum(repeated - 2, 0)
+    ratio = (params.second_interval / old_params.second_interval
+             * np.power(params.interval_modifier / old_params.interval_modifier, exponent))
+    ratio = np.where(repeated <= 1, params.first_interval / old_params.first_interval, ratio)
+    return np.minimum(interval * ratio, params.max_interval)
+
+
+def reschedule(state, params=DEFAULT_PARAMETERS, old_params=DEFAULT_PARAMETERS):
+    """Return (interval, next_review) arrays re-planned with the given parameters
+
+    Tasks never reviewed have no interval yet and wait the first interval from their creation.
+    Due times move by the change of the interval, so they stay anchored to the last review.
+    """
+    unreviewed = state['interval'] <= 0
+    planned = np.where(unreviewed, old_params.first_interval, state['interval'])
+    interval = plan_intervals(planned, state['repeated'], params, old_params)
+    next_review = state['next_review'] + (interval - planned) * DAY
+    return np.where(unreviewed, 0.0, interval), next_review
+
+
+def load_schedule_state(store):
+    """Read the scheduling columns of every task into a structured array"""
+    rows = store.schedule_state()
+    return np.fromiter(rows, dtype=STATE_DTYPE)
+
+
+def reschedule_store(store, params=DEFAULT_PARAMETERS, old_params=DEFAULT_PARAMETERS):
+    """Re-plan the whole deck with new parameters and write it back; returns the task count
+
+    old_params are those the stored intervals were planned with: the defaults, which reviews
+    are applied with.
+    """
+    state = load_schedule_state(store)
+    interval, next_review = reschedule(state, params, old_params)
+    store.update_schedules(zip(interval.tolist(), next_review.tolist(), state['id'].tolist()))
+    return len(state)
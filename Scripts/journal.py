@@ -0,0 +1,292 @@
+import glob
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def journal_path_for(db_path):
+    """Return the journal file that belongs to a task database"""
+    return os.path.splitext(db_path)[0] + '.journal'
+
+
+def lock_file(lock, blocking=True):
+    """Take an exclusive lock on an open file; False when blocking is off and another process has it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        if blocking:
+            raise
+        return False
+    return True
+
+
+def unlock_file(lock):
+    """Release a lock taken with lock_file"""
+    if fcntl is not None:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+    else:
+        lock.seek(0)
+        msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ReviewJournal:
+    """Append-only log of review and creation events, fsynced in batches
+
+    One process at a time owns the journal of a deck: it holds an exclusive lock on
+    <journal>.lock, numbers the events and is the only one that rotates, folds or deletes journal
+    files. Other processes (the command line while the app is open, a second window) are guests:
+    they append unnumbered events to <journal>.inbox, which the owner journals under its own
+    sequence numbers at its next compaction. A guest takes over once the owner has gone.
+    """
+
+    def __init__(self, path, flush_interval=0.5, flush_records=256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._unsynced = 0
+        self._seq = 0
+        self._file = None
+        self._flusher = None
+        self._compactor = None
+        self._running = False
+        self._stopped = threading.Event()
+        self.lock_path = path + '.lock'
+        self.inbox_path = path + '.inbox'
+        self.owner = False
+        self._lock_file = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def open(self, store):
+        """Take the journal over and apply leftover events, or join as a guest; then start appending"""
+        if self._acquire():
+            self._take_over(store)
+        else:
+            self._file = open(self.inbox_path, 'a', encoding='utf-8')
+        self._running = True
+        self._flusher = threading.Thread(target=self._flush_loop, name='journal-flush', daemon=True)
+        self._flusher.start()
+
+    def record_review(self, task_id, grade, ts=None):
+        """Append a graded review"""
+        self.append('review', task_id, grade, time.time() if ts is None else ts)
+
+    def record_creation(self, task_id, ts=None):
+        """Append a task creation"""
+        self.append('create', task_id, '', time.time() if ts is None else ts)
+
+    def on_store_change(self, event, rows):
+        """Store subscriber that journals newly created tasks"""
+        if event == 'add':
+            for row in rows:
+                self.record_creation(row[0], row[3])
+
+    def append(self, kind, task_id, grade, ts):
+        """Buffer one event; it reaches the disk with the next batched fsync"""
+        with self._lock:
+            if self.owner:
+                self._seq += 1
+                self._file.write(f'{self._seq}\t{kind}\t{task_id}\t{grade}\t{ts!r}\n')
+            else:
+                # The owner empties the inbox under the same lock, so no line is lost in between
+                lock_file(self._file)
+                try:
+                    self._file.write(f'{kind}\t{task_id}\t{grade}\t{ts!r}\n')
+                    self._file.flush()
+                finally:
+                    unlock_file(self._file)
+            self._unsynced += 1
+            if self._unsynced >= self.flush_records:
+                self._cond.notify()
+
+    def flush(self):
+        """Write buffered events and fsync the journal"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def _flush_loop(self):
+        with self._lock:
+            while self._running:
+                self._cond.wait(self.flush_interval)
+                self._sync()
+
+    def rotate(self):
+        """Seal the active journal file so it can be compacted; returns False when it was empty"""
+        with self._lock:
+            self._sync()
+            if self._file is None or self._file.tell() == 0:
+                return False
+            self._file.close()
+            os.replace(self.path, f'{self.path}.{time.time_ns()}')
+            self._file = open(self.path, 'a', encoding='utf-8')
+            return True
+
+    def sealed_segments(self):
+        """Return sealed journal files, oldest first"""
+        names = [name for name in glob.glob(glob.escape(self.path) + '.*') if name.rsplit('.', 1)[1].isdigit()]
+        return sorted(names, key=lambda name: int(name.rsplit('.', 1)[1]))
+
+    def replay(self, paths=None, after_seq=0):
+        """Yield (seq, kind, task_id, grade, ts) events newer than after_seq"""
+        if paths is None:
+            paths = self.sealed_segments() + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    fields = line.rstrip('\n').split('\t')
+                    if not line.endswith('\n') or len(fields) != 5:
+                        break
+                    seq = int(fields[0])
+                    if seq > after_seq:
+                        grade = int(fields[3]) if fields[3] else None
+                        yield seq, fields[1], int(fields[2]), grade, float(fields[4])
+
+    def compact(self, store):
+        """Fold sealed journal files into the store snapshot and delete them
+
+        Returns the number of reviews folded, 0 when another process owns the journal: that
+        process compacts it itself.
+        """
+        if self.owner:
+            return self._fold(store)
+        if not self._acquire():
+            return 0
+        if self._file is not None:
+            return self._take_over(store)
+        try:
+            return self._fold(store)
+        finally:
+            self._release()
+
+    def _fold(self, store):
+        """Seal the active file and fold every sealed one into the store; needs the journal lock"""
+        if self.owner:
+            self._take_inbox()
+            self.rotate()
+        elif os.path.exists(self.path) and os.path.getsize(self.path):
+            # Left by an owner that has gone; nobody else can have it open while we hold the lock
+            os.replace(self.path, f'{self.path}.{time.time_ns()}')
+
+        segments = self.sealed_segments()
+        if not segments:
+            return 0
+        # Imported here so processes that never fold reviews (guests) do not load numpy
+        from intervals import review
+        applied = store.apply_events(self.replay(segments, store.journal_seq()), review)
+        with self._lock:
+            self._seq = max(self._seq, store.journal_seq())
+        for path in segments:
+            os.remove(path)
+        return applied
+
+    def _take_over(self, store):
+        """Become the owner once the lock is held: fold what the last owner left, then number events here
+
+        A guest keeps appending to the inbox until the switch, and its own queued events come back
+        through the inbox like everyone else's.
+        """
+        applied = self._fold(store)
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+            self._seq = store.journal_seq()
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self.owner = True
+        self._take_inbox()
+        return applied
+
+    def _take_inbox(self):
+        """Journal the events guests left in the inbox and empty it"""
+        try:
+            inbox = open(self.inbox_path, 'r+', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with inbox:
+            lock_file(inbox)
+            try:
+                lines = inbox.read().splitlines(keepends=True)
+                if not lines:
+                    return
+                for line in lines:
+                    fields = line.rstrip('\n').split('\t')
+                    if not line.endswith('\n') or len(fields) != 4:
+                        break
+                    self.append(fields[0], int(fields[1]), fields[2], float(fields[3]))
+                # The events are on disk in the journal before they leave the inbox
+                self.flush()
+                inbox.seek(0)
+                inbox.truncate()
+                inbox.flush()
+                os.fsync(inbox.fileno())
+            finally:
+                unlock_file(inbox)
+
+    def _acquire(self):
+        """Try to take the journal lock without waiting"""
+        lock = open(self.lock_path, 'a+', encoding='utf-8')
+        if not lock_file(lock, blocking=False):
+            lock.close()
+            return False
+        self._lock_file = lock
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            unlock_file(self._lock_file)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def start_compaction(self, store, interval=2.0):
+        """Compact the journal into the store periodically on a background thread"""
+        self._compactor = threading.Thread(
+            target=self._compact_loop, args=(store, interval), name='journal-compact', daemon=True
+        )
+        self._compactor.start()
+
+    def _compact_loop(self, store, interval):
+        try:
+            while not self._stopped.wait(interval):
+                self.compact(store)
+        finally:
+            store.release()
+
+    def close(self, store=None):
+        """Stop background threads, flush, and optionally compact one last time"""
+        self._stopped.set()
+        with self._lock:
+            self._running = False
+            self._cond.notify_all()
+        for thread in (self._flusher, self._compactor):
+            if thread is not None:
+                thread.join()
+        if store is not None:
+            self.compact(store)
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.owner = False
+        self._release()
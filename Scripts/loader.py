@@ -0,0 +1,173 @@
+import threading
+from collections import OrderedDict, deque
+from tk_queue import MainLoopQueue
+
+
+class AsyncPageSource:
+    """Row source that fetches blocks on a worker thread and hands them to the Tk loop"""
+
+    def __init__(self, root, fetch_count, fetch_block, on_loaded, on_busy=None, on_exit=None,
+                 block_size=200, max_blocks=16, read_ahead=1):
+        self.fetch_count = fetch_count
+        self.fetch_block = fetch_block
+        self.on_exit = on_exit
+        self.on_loaded = on_loaded
+        self.on_busy = on_busy
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.read_ahead = read_ahead
+
+        self._total = 0
+        self._blocks = OrderedDict()
+        self._pending = {}
+        self._requests = deque()
+        self._cond = threading.Condition()
+        self._cancelled = False
+
+        self._results = MainLoopQueue(root, self._on_results, interval=15)
+        self._thread = threading.Thread(target=self._run, name='page-loader', daemon=True)
+        self._set_busy(True)
+        self._thread.start()
+        self.request(0)
+
+    def count(self):
+        """Return the number of rows, 0 until the worker has counted them"""
+        return self._total
+
+    def rows(self, offset, limit):
+        """Return the loaded rows of a range, requesting missing blocks"""
+        result = []
+        end = min(offset + limit, self._total)
+        position = offset
+        while position < end:
+            block_index, start = divmod(position, self.block_size)
+            block = self._blocks.get(block_index)
+            if block is None:
+                self.request(block_index)
+                break
+            self._blocks.move_to_end(block_index)
+            chunk = block[start:start + end - position]
+            if not chunk:
+                break
+            result.extend(chunk)
+            position += len(chunk)
+        return result
+
+    def request(self, block_index, urgent=True):
+        """Ask the worker for a block unless it is cached or already queued"""
+        if block_index < 0 or block_index in self._blocks or block_index in self._pending:
+            return
+        self._pending[block_index] = urgent
+        with self._cond:
+            if urgent:
+                self._requests.appendleft(block_index)
+            else:
+                self._requests.append(block_index)
+            self._cond.notify()
+        self._set_busy(True)
+
+    def cancel(self):
+        """Stop the worker and ignore anything it still delivers"""
+        with self._cond:
+            self._cancelled = True
+            self._requests.clear()
+            self._cond.notify()
+        self._results.close()
+
+    def _run(self):
+        try:
+            total = self.fetch_count()
+            self._results.put(('count', total, None))
+            while True:
+                with self._cond:
+                    while not self._requests and not self._cancelled:
+                        self._cond.wait()
+                    if self._cancelled:
+                        return
+                    block_index = self._requests.popleft()
+                rows = self.fetch_block(block_index * self.block_size, self.block_size)
+                self._results.put(('block', block_index, rows))
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def _on_results(self, results):
+        """Merge a batch of worker results into the cache on the Tk thread"""
+        if self._cancelled:
+            return
+        for kind, key, rows in results:
+            if kind == 'count':
+                self._total = key
+                continue
+            urgent = self._pending.pop(key, False)
+            self._blocks[key] = rows
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+            if urgent:
+                for ahead in range(1, self.read_ahead + 1):
+                    if (key + ahead) * self.block_size < self._total:
+                        self.request(key + ahead, urgent=False)
+
+        self._set_busy(bool(self._pending))
+        self.on_loaded()
+
+    def _set_busy(self, busy):
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+
+class LatestRequestWorker:
+    """Runs job(request) on a worker thread and hands the result to the Tk loop, newest request only
+
+    A request replaces one still waiting, and the results of requests superseded while they ran
+    are dropped, so fast typing never queues up stale work.
+    """
+
+    def __init__(self, root, job, on_result, on_exit=None, name='request-worker'):
+        self.job = job
+        self.on_result = on_result
+        self.on_exit = on_exit
+
+        self._request = None
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._results = MainLoopQueue(root, self._on_results, interval=15)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        """Run the job for this request once the worker is free, dropping any request still waiting"""
+        with self._cond:
+            self._generation += 1
+            self._request = (self._generation, request)
+            self._cond.notify()
+
+    def close(self):
+        """Stop the worker and ignore anything it still delivers"""
+        with self._cond:
+            self._closed = True
+            self._request = None
+            self._cond.notify()
+        self._results.close()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while self._request is None and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    generation, request = self._request
+                    self._request = None
+                self._results.put((generation, self.job(request)))
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def _on_results(self, results):
+        generation, result = results[-1]
+        if not self._closed and generation == self._generation:
+            self.on_result(result)
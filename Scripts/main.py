@@ -1,7 +1,18 @@
+import time
+
+STARTED = time.perf_counter()
+
+import sys
 import tkinter as tk
 from main_window import MainWindow
+from startup_profile import StartupProfile
 
 if __name__ == "__main__":
+    profile = StartupProfile(STARTED) if '--profile-startup' in sys.argv[1:] else None
+    if profile is not None:
+        profile.mark('imports')
     root = tk.Tk()
-    app = MainWindow(root)
-    root.mainloop()
\ No newline at end of file
+    if profile is not None:
+        profile.mark('tk root')
+    app = MainWindow(root, profile)
+    root.mainloop()
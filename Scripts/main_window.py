@@ -1,73 +1,158 @@
+import threading
 import tkinter as tk
 from tkinter import ttk
-from task_creation import *
-from showing_tasks import *
+from startup_profile import NoProfile
+from tk_queue import MainLoopQueue
+from theme import COLORS, setup_theme
+from watchdog import MainLoopWatchdog
+from window_pool import WindowPool
+
+# Store, scheduler, journal and the secondary windows are imported when first needed, so the
+# main window can be drawn before their modules (and the database) are loaded.
+
 
 class MainWindow:
-    def __init__(self, window):
+    def __init__(self, window, profile=None):
         self.root = window
         self.root.title("Better Learning")
-        self.root.geometry("900x500")
         self.root.resizable(False, False)
+        self.profile = profile or NoProfile()
 
-        self.colors = {
-            'bg': '#0f172a',
-            'card': '#1e293b',
-            'primary': '#3b82f6',
-            'secondary': '#8b5cf6',
-            'text': '#f1f5f9',
-            'button_text': '#0f172a',
-            'text_secondary': '#94a3b8',
-            'border': '#334155',
-            'success': '#10b981',
-            'danger': '#ef4444'
-        }
+        self.store = None
+        self.deck_manager = None
+        self.deck_queue = None
+        self.due_ids = set()
+
+        self.colors = COLORS
 
         self.root.configure(bg=self.colors['bg'])
-        self.setup_styles()
-        self.center_window()
+        setup_theme(self.root)
+        self.center_window(900, 500)
         self.create_layout()
+        self.profile.mark('main window layout')
+
+        self.window_pool = WindowPool(self.root)
+        self.watchdog = MainLoopWatchdog(self.root)
+        self.root.bind('<Map>', self.on_first_map)
+        self.root.protocol('WM_DELETE_WINDOW', self.close)
+
+    def on_first_map(self, event):
+        """Start the services once the window has been drawn"""
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>')
+        self.root.after_idle(self.on_first_paint)
+
+    def on_first_paint(self):
+        """Start the watchdog and services, then build the pooled windows once the app is idle"""
+        self.profile.mark('first paint')
+        self.watchdog.start()
+        self.start_services()
+        self.root.after(500, self.prepare_windows)
+
+    def start_services(self):
+        """Open the current deck's store and start the journal, scheduler and search index"""
+        if self.store is not None:
+            return
+        from task_store import TaskStore
+        from journal import ReviewJournal, journal_path_for
+
+        if self.deck_manager is None:
+            from decks import DeckManager
+
+            # Worker processes would re-import this app's main module and Tk with it
+            self.deck_manager = DeckManager(workers=1)
+            self.deck = self.deck_manager.current()
+            self.deck_queue = MainLoopQueue(self.root, self.on_deck_summaries)
+        self.root.title(f"Better Learning — {self.deck.name}")
+        self.deck_var.set(self.deck.name)
+
+        self.store = TaskStore(self.deck.path)
+        self.deck_stopped = threading.Event()
+        self.journal = ReviewJournal(journal_path_for(self.store.path))
+        self.journal.open(self.store)
+        self.store.subscribe(self.journal.on_store_change)
+        self.journal.start_compaction(self.store)
+        self.profile.mark('store and journal')
+
+        self.start_scheduler()
+        self.start_search_index()
+        self.start_duplicate_index()
+        self.profile.mark('background services')
+        self.refresh_decks()
+
+    def stop_services(self):
+        """Close the current deck: stop its background work and drop its windows"""
+        if self.store is None:
+            return
+        self.deck_stopped.set()
+        self.scheduler.stop()
+        self.notifier.stop()
+        self.due_queue.close()
+        self.window_pool.destroy()
+        self.journal.close(self.store)
+        self.store.close()
+        self.store = None
+        self.due_ids.clear()
+        self.update_due_label()
+
+    def refresh_decks(self):
+        """Count due tasks in every deck on a background thread and update the deck selector"""
+        def count():
+            self.deck_queue.put(self.deck_manager.summaries())
+
+        threading.Thread(target=count, name='deck-summaries', daemon=True).start()
+
+    def on_deck_summaries(self, batches):
+        """Show the due counts next to the deck names"""
+        self.deck_names = list(batches[-1])
+        self.deck_selector['values'] = [
+            name if isinstance(summary, Exception) else f"{name} ({summary[1]} due)"
+            for name, summary in batches[-1].items()
+        ]
+        if self.deck.name in self.deck_names:
+            self.deck_selector.current(self.deck_names.index(self.deck.name))
 
-    def setup_styles(self):
-        """Setup styles for minimalist design"""
-        style = ttk.Style()
-
-        # Style for titles
-        style.configure('Title.TLabel',
-                        background=self.colors['bg'],
-                        foreground=self.colors['text'],
-                        font=('Inter', 32, 'bold'),
-                        padding=10)
-
-        # Style for subtitles
-        style.configure('Subtitle.TLabel',
-                        background=self.colors['bg'],
-                        foreground=self.colors['text_secondary'],
-                        font=('Inter', 14),
-                        padding=5)
-
-        # Style for cards
-        style.configure('Card.TFrame',
-                        background=self.colors['card'],
-                        relief='flat',
-                        borderwidth=0)
-
-        # Style for action buttons
-        style.configure('Action.TButton',
-                        background=self.colors['primary'],
-                        foreground=self.colors['button_text'],
-                        borderwidth=0,
-                        font=('Inter', 12, 'bold'),
-                        padding=15)
-        style.map('Action.TButton',
-                  background=[('active', '#2563eb')])
-
-
-    def center_window(self):
-        """Center the window on screen"""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
+    def on_deck_selected(self, event):
+        """Switch to the deck picked in the selector"""
+        index = self.deck_selector.current()
+        if 0 <= index < len(self.deck_names):
+            self.switch_deck(self.deck_names[index])
+
+    def switch_deck(self, name):
+        """Close the current deck and open another one"""
+        if self.deck_manager is None:
+            self.start_services()
+        if name == self.deck.name:
+            return
+        self.stop_services()
+        self.deck = self.deck_manager.get(name)
+        self.deck_manager.select(name)
+        self.start_services()
+
+    def new_deck(self):
+        """Ask for a name, create the deck and switch to it"""
+        from tkinter import messagebox, simpledialog
+
+        self.start_services()
+        name = simpledialog.askstring("New deck", "Deck name:", parent=self.root)
+        if not name:
+            return
+        try:
+            deck = self.deck_manager.create(name)
+        except ValueError as error:
+            messagebox.showerror("Cannot create deck", str(error), parent=self.root)
+            return
+        self.switch_deck(deck.name)
+
+    def prepare_windows(self):
+        """Build the task dialog ahead of its first use"""
+        from task_creation import Task
+
+        self.window_pool.prepare(Task, self.store, self.duplicates)
+
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
         x = (self.root.winfo_screenwidth() // 2) - (width // 2)
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
@@ -116,6 +201,32 @@ class MainWindow:
         )
         subtitle_label.pack(pady=5)
 
+        self.due_label = ttk.Label(
+            parent,
+            text="",
+            style='Subtitle.TLabel',
+            anchor="center"
+        )
+        self.due_label.pack(pady=5)
+
+        deck_frame = ttk.Frame(parent, style='Card.TFrame')
+        deck_frame.pack(fill='x', pady=(15, 0))
+
+        self.deck_var = tk.StringVar()
+        self.deck_names = []
+        self.deck_selector = ttk.Combobox(deck_frame, textvariable=self.deck_var, state='readonly', width=22)
+        self.deck_selector.pack(side='left', fill='x', expand=True)
+        self.deck_selector.bind('<<ComboboxSelected>>', self.on_deck_selected)
+
+        new_deck_btn = ttk.Button(
+            deck_frame,
+            text="New deck",
+            style='Success.TButton',
+            command=self.new_deck,
+            cursor='hand2'
+        )
+        new_deck_btn.pack(side='left', padx=(10, 0))
+
     def create_actions_panel(self, parent):
         """Create actions panel"""
         actions_title = tk.Label(
@@ -126,6 +237,8 @@ class MainWindow:
             fg=self.colors['text']
         )
         actions_title.pack(pady=(0, 30))
+        actions_title.bind('<Double-Button-1>', lambda e: self.show_diagnostics())
+        self.root.bind('<Control-Shift-D>', lambda e: self.show_diagnostics())
 
         buttons_frame = ttk.Frame(parent, style='Card.TFrame')
         buttons_frame.pack(fill='both', expand=True)
@@ -150,11 +263,168 @@ class MainWindow:
         )
         show_tasks_btn.pack(fill='x', pady=10, ipady=10)
 
+        # Third button - Review
+        review_btn = ttk.Button(
+            buttons_frame,
+            text="Review due tasks",
+            style='Action.TButton',
+            command=self.start_review,
+            cursor='hand2'
+        )
+        review_btn.pack(fill='x', pady=10, ipady=10)
+
+    def start_scheduler(self):
+        """Start firing review reminders from the task store"""
+        from notifications import NotificationDispatcher, default_backend, task_summarizer
+        from review_stats import ReviewStats
+        from scheduler import ReviewScheduler
+        from task_model import TaskTable
+
+        self.due_queue = MainLoopQueue(self.root, self.on_reviews_due)
+        self.notifier = NotificationDispatcher(
+            default_backend(self.root),
+            summarize=task_summarizer(self.store),
+            on_exit=self.store.release
+        )
+        self.scheduler = ReviewScheduler(self.on_due)
+        self.task_table = TaskTable()
+        self.stats = ReviewStats(self.task_table)
+        # The statistics read a task's previous due day from the table, so they go first
+        self.store.subscribe(self.stats.on_store_change)
+        self.store.subscribe(self.task_table.on_store_change)
+        self.store.subscribe(self.on_store_change)
+        self.notifier.start()
+        self.scheduler.start()
+        self.reload_task_table()
+
+    def reload_task_table(self):
+        """Reload the task table, scheduler and statistics of the current deck in the background"""
+        self.run_in_background(self.load_task_table, 'task-table', self.task_table, self.scheduler,
+                               self.stats, self.deck_stopped)
+
+    def load_task_table(self, store, task_table, scheduler, stats, stopped):
+        """Load the scheduling fields of every task and queue them; runs off the Tk thread"""
+        task_table.load(store)
+        if stopped.is_set():
+            return
+        scheduler.load(zip(task_table.ids, task_table.next_review))
+        stats.rebuild(store)
+        self.profile.mark('task table loaded')
+
+    def start_search_index(self):
+        """Build the search index on a background thread"""
+        from search_index import SearchIndex
+
+        self.search_index = SearchIndex()
+        self.store.subscribe(self.search_index.on_store_change)
+        self.run_in_background(self.build_search_index, 'search-index', self.search_index)
+
+    def build_search_index(self, store, search_index):
+        """Index every task for search; runs off the Tk thread"""
+        search_index.build(store)
+        self.profile.mark('search index built')
+
+    def start_duplicate_index(self):
+        """Build the near-duplicate index on a background thread"""
+        from duplicates import DuplicateIndex
+
+        self.duplicates = DuplicateIndex()
+        self.store.subscribe(self.duplicates.on_store_change)
+        self.run_in_background(self.duplicates.build, 'duplicate-index')
+
+    def run_in_background(self, target, name, *args):
+        """Run target(store, *args) on a daemon thread that releases its connection afterwards
+
+        The store, and the deck's objects passed in args, are captured here: by the time the job
+        ends a deck switch may have closed them and put another deck's in their place. A job is
+        skipped when its deck has been stopped before it starts; long jobs take deck_stopped as
+        an argument and drop their results when it is set meanwhile.
+        """
+        store, deck, stopped = self.store, self.deck, self.deck_stopped
+
+        def run():
+            try:
+                if not stopped.is_set():
+                    target(store, *args)
+            finally:
+                store.release()
+
+        threading.Thread(target=run, name=f'{name} ({deck.name})', daemon=True).start()
+
+    def on_due(self, task_ids):
+        """Scheduler callback: update the window and queue a notification; runs on the scheduler thread"""
+        self.due_queue.put(('due', task_ids))
+        self.notifier.notify_due(task_ids)
+
+    def on_store_change(self, event, rows):
+        """Keep the scheduler and the due count in step with added or changed tasks
+
+        Runs on whichever thread changed the store, so due_ids is left to the main loop: the
+        change is queued for on_reviews_due.
+        """
+        if event in ('reload', 'import'):
+            self.due_queue.put(('clear', ()))
+            self.reload_task_table()
+            if event == 'import':
+                self.run_in_background(self.search_index.rebuild, 'search-index')
+                self.run_in_background(self.duplicates.rebuild, 'duplicate-index')
+            return
+        if event not in ('add', 'update'):
+            return
+        for row in rows:
+            self.scheduler.schedule(row[0], row[4])
+        task_ids = [row[0] for row in rows]
+        self.due_queue.put(('done', task_ids))
+        self.notifier.discard(task_ids)
+
+    def on_reviews_due(self, batches):
+        """Apply due and rescheduled tasks on the main loop in the order they came, then update the label"""
+        for kind, task_ids in batches:
+            if kind == 'due':
+                self.due_ids.update(task_ids)
+            elif kind == 'done':
+                self.due_ids.difference_update(task_ids)
+            else:
+                self.due_ids.clear()
+        self.update_due_label()
+
+    def update_due_label(self):
+        """Show how many tasks are waiting for repetition"""
+        count = len(self.due_ids)
+        self.due_label.configure(text=f"{count} task(s) due for repetition" if count else "")
+
+    def close(self):
+        """Stop background work and close the application"""
+        self.watchdog.stop()
+        if self.deck_queue is not None:
+            self.deck_queue.close()
+        self.stop_services()
+        self.window_pool.destroy()
+        self.root.destroy()
+
     def add_task(self):
         """Add task"""
-        task_window = Task(self.root)
+        from task_creation import Task
 
+        self.start_services()
+        self.window_pool.show(Task, self.store, self.duplicates)
 
     def show_tasks(self):
         """Show tasks"""
-        list_task_window = ListTasks(self.root)
\ No newline at end of file
+        from showing_tasks import ListTasks
+
+        self.start_services()
+        self.window_pool.show(ListTasks, self.store, self.search_index, self.stats, self.task_table)
+
+    def start_review(self):
+        """Review the tasks that are due"""
+        from review_session import ReviewSession
+
+        self.start_services()
+        self.window_pool.show(ReviewSession, self.store, self.journal)
+
+    def show_diagnostics(self):
+        """Show the hidden diagnostics panel"""
+        from diagnostics import DiagnosticsPanel
+
+        self.window_pool.show(DiagnosticsPanel, self.watchdog)
@@ -0,0 +1,269 @@
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+APP_NAME = 'Better Learning'
+
+
+def summarize_count(task_ids):
+    """Default notification text: how many tasks are due"""
+    count = len(task_ids)
+    return f"{count} task(s) due for repetition"
+
+
+def task_summarizer(store, shown=3):
+    """Notification text naming the first few due tasks from the store"""
+    def summarize(task_ids):
+        names = [row[1] for row in store.get_summaries(task_ids[:shown])]
+        text = summarize_count(task_ids)
+        if names:
+            text += ':\n' + '\n'.join(f'• {name}' for name in names)
+            if len(task_ids) > len(names):
+                text += f'\n…and {len(task_ids) - len(names)} more'
+        return text
+    return summarize
+
+
+class MemoryBackend:
+    """Keeps notifications in a list; used where no desktop is available and in checks"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, title, body):
+        """Keep the notification"""
+        self.sent.append((title, body))
+        return True
+
+    def close(self):
+        """Nothing to release"""
+        pass
+
+
+class StreamBackend:
+    """Writes notifications as text lines, e.g. to the log of a headless service"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def send(self, title, body):
+        """Write the notification as one line"""
+        stream = self.stream or sys.stdout
+        stream.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {title}: {body}\n")
+        stream.flush()
+        return True
+
+    def close(self):
+        """Nothing to release"""
+        pass
+
+
+class NotifySendBackend:
+    """Delivers through notify-send, which talks to the desktop's D-Bus notification service"""
+
+    def __init__(self, fallback=None, timeout=5):
+        self.command = shutil.which('notify-send')
+        self.fallback = fallback
+        self.timeout = timeout
+
+    @staticmethod
+    def available():
+        return shutil.which('notify-send') is not None
+
+    def send(self, title, body):
+        """Run notify-send, falling back when it fails"""
+        try:
+            result = subprocess.run(
+                [self.command, '--app-name', APP_NAME, title, body],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=self.timeout,
+                check=False
+            )
+            if result.returncode == 0:
+                return True
+        except (OSError, subprocess.SubprocessError):
+            pass
+        return self.fallback.send(title, body) if self.fallback is not None else False
+
+    def close(self):
+        """Close the fallback backend"""
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class TkToastBackend:
+    """Shows a small window in the screen corner; notifications are handed to the Tk thread"""
+
+    def __init__(self, root, duration=6000):
+        from tk_queue import MainLoopQueue
+
+        self.root = root
+        self.duration = duration
+        self.toast = None
+        self._hide_id = None
+        self._queue = MainLoopQueue(root, self.show, interval=250)
+
+    def send(self, title, body):
+        """Queue the notification for the Tk thread"""
+        self._queue.put((title, body))
+        return True
+
+    def show(self, notifications):
+        """Display the newest notification; runs on the Tk thread"""
+        import tkinter as tk
+        from theme import COLORS
+
+        title, body = notifications[-1]
+        if self.toast is None:
+            self.toast = tk.Toplevel(self.root)
+            self.toast.overrideredirect(True)
+            self.toast.attributes('-topmost', True)
+            self.toast.configure(bg=COLORS['card'], highlightthickness=1,
+                                 highlightbackground=COLORS['border'])
+            self.title_label = tk.Label(self.toast, font='BLSection', bg=COLORS['card'],
+                                        fg=COLORS['text'], anchor='w')
+            self.title_label.pack(fill='x', padx=15, pady=(10, 0))
+            self.body_label = tk.Label(self.toast, font='BLNormal', bg=COLORS['card'],
+                                       fg=COLORS['text_secondary'], anchor='w', justify='left',
+                                       wraplength=320)
+            self.body_label.pack(fill='x', padx=15, pady=(0, 10))
+            self.toast.bind('<Button-1>', lambda e: self.hide())
+
+        self.title_label.configure(text=title)
+        self.body_label.configure(text=body)
+        self.toast.update_idletasks()
+        x = self.toast.winfo_screenwidth() - self.toast.winfo_reqwidth() - 20
+        y = self.toast.winfo_screenheight() - self.toast.winfo_reqheight() - 60
+        self.toast.geometry(f'+{x}+{y}')
+        self.toast.deiconify()
+
+        if self._hide_id is not None:
+            self.root.after_cancel(self._hide_id)
+        self._hide_id = self.root.after(self.duration, self.hide)
+
+    def hide(self):
+        self._hide_id = None
+        if self.toast is not None:
+            self.toast.withdraw()
+
+    def close(self):
+        """Stop showing notifications and destroy the window"""
+        self._queue.close()
+        if self._hide_id is not None:
+            self.root.after_cancel(self._hide_id)
+            self._hide_id = None
+        if self.toast is not None:
+            self.toast.destroy()
+            self.toast = None
+
+
+def default_backend(root=None):
+    """notify-send when installed, otherwise a Tk toast (or standard output without a Tk root)"""
+    fallback = TkToastBackend(root) if root is not None else StreamBackend()
+    if NotifySendBackend.available():
+        return NotifySendBackend(fallback)
+    return fallback
+
+
+class NotificationDispatcher:
+    """Turns due-task events into few desktop notifications
+
+    Tasks that come due within `window` seconds of the first pending one are summarized in a
+    single notification. A token bucket (`burst` notifications, refilled at `rate` per second)
+    bounds how often the backend is called; while it is empty, new tasks keep joining the
+    pending summary instead of producing notifications of their own.
+    """
+
+    def __init__(self, backend, window=5.0, rate=1 / 60, burst=2, summarize=summarize_count,
+                 on_exit=None, clock=time.monotonic):
+        self.backend = backend
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.summarize = summarize
+        self.on_exit = on_exit
+        self.clock = clock
+
+        self.sent = 0
+        self._pending = {}
+        self._first_pending = None
+        self._tokens = float(burst)
+        self._refilled = clock()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def notify_due(self, task_ids):
+        """Queue due tasks; safe to call from any thread"""
+        with self._cond:
+            if not self._pending:
+                self._first_pending = self.clock()
+            self._pending.update(dict.fromkeys(task_ids))
+            if self._pending:
+                self._cond.notify()
+
+    def discard(self, task_ids):
+        """Drop tasks that were reviewed or rescheduled before the notification went out"""
+        with self._cond:
+            for task_id in task_ids:
+                self._pending.pop(task_id, None)
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='notifications', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the dispatcher thread; pending tasks are dropped"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    task_ids = self._wait_for_batch()
+                if task_ids is None:
+                    return
+                self.backend.send(APP_NAME, self.summarize(task_ids))
+                self.sent += 1
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def _wait_for_batch(self):
+        """Sleep until a summary may be sent; return its task ids, or None when stopped"""
+        while self._running:
+            if not self._pending:
+                self._cond.wait()
+                continue
+
+            now = self.clock()
+            self._refill(now)
+            ready_at = self._first_pending + self.window
+            if self._tokens < 1:
+                ready_at = max(ready_at, now + (1 - self._tokens) / self.rate)
+            if ready_at > now:
+                self._cond.wait(ready_at - now)
+                continue
+
+            self._tokens -= 1
+            task_ids = list(self._pending)
+            self._pending.clear()
+            return task_ids
+        return None
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
@@ -0,0 +1,287 @@
+import collections
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+from instrumentation import METRICS
+from task_model import TaskRecord
+from task_store import TaskFilter
+from theme import COLORS, setup_theme
+from tk_queue import MainLoopQueue
+
+GRADES = (
+    (0, "Blackout"),
+    (1, "Wrong"),
+    (2, "Hard wrong"),
+    (3, "Hard"),
+    (4, "Good"),
+    (5, "Easy")
+)
+
+
+class ReviewQueue:
+    """Cards due at the start of a session, prefetched with descriptions on a worker thread
+
+    The worker keeps up to `prefetch` cards ready and walks the due tasks with a keyset on
+    (next_review, id), so graded cards are never handed out twice.
+    """
+
+    def __init__(self, store, prefetch=20, on_ready=None, now=None):
+        self.store = store
+        self.prefetch = prefetch
+        self.on_ready = on_ready
+        self.task_filter = TaskFilter(due_before=time.time() if now is None else now)
+        self.total = None
+
+        self._ready = collections.deque()
+        self._after = None
+        self._exhausted = False
+        self._running = False
+        self._waiting = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """Start prefetching cards on a background thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='review-prefetch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop prefetching and wait for the thread to finish"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def finished(self):
+        """True once every due card has been handed out"""
+        with self._cond:
+            return self._exhausted and not self._ready
+
+    def next_card(self):
+        """Return the next prefetched card, or None if it is still loading or the session is done
+
+        When None is returned while cards remain, on_ready is called once the next card arrives.
+        """
+        with self._cond:
+            card = self._ready.popleft() if self._ready else None
+            self._waiting = card is None
+            if len(self._ready) < self.prefetch // 2:
+                self._cond.notify()
+            return card
+
+    def _run(self):
+        try:
+            self.total = self.store.count_filtered(self.task_filter)
+            while True:
+                with self._cond:
+                    while self._running and (self._exhausted or len(self._ready) >= self.prefetch):
+                        self._cond.wait()
+                    if not self._running:
+                        return
+                    wanted = self.prefetch - len(self._ready)
+                cards = self._fetch(wanted)
+                with self._cond:
+                    self._ready.extend(cards)
+                    self._exhausted = len(cards) < wanted
+                    notify = self._waiting and self.on_ready is not None
+                    self._waiting = False
+                if notify:
+                    self.on_ready()
+        finally:
+            self.store.release()
+
+    @METRICS.timed('review.prefetch')
+    def _fetch(self, limit):
+        rows = self.store.query_page('next_review', task_filter=self.task_filter, limit=limit, after=self._after)
+        if not rows:
+            return []
+        self._after = (rows[-1][3], rows[-1][0])
+        full = self.store.get_many(row[0] for row in rows)
+        return [TaskRecord(self.store, task_id, name, created, next_review, repeated, description)
+                for task_id, name, description, created, next_review, repeated in full]
+
+
+class ReviewSession:
+    """Window that walks through the due cards; grades go to the review journal"""
+
+    def __init__(self, main_root, store, journal, prefetch=20):
+        self.main_root = main_root
+        self.store = store
+        self.journal = journal
+        self.prefetch = prefetch
+        self.queue = None
+        self.card = None
+        self.reviewed = 0
+        self.answer_shown = False
+
+        self.root = tk.Toplevel(main_root)
+        self.root.title("Review")
+        self.root.resizable(False, False)
+
+        self.root.transient(main_root)
+        self.root.protocol('WM_DELETE_WINDOW', self.close_window)
+
+        self.colors = COLORS
+
+        self.root.configure(bg=self.colors['bg'])
+        setup_theme(self.root)
+        self.center_window(900, 500)
+        self.create_window_style()
+
+        self.ready_queue = None
+        self.root.bind('<space>', lambda e: self.show_answer())
+        for grade, _ in GRADES:
+            self.root.bind(str(grade), lambda e, g=grade: self.grade(g))
+        self.start_session()
+
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'{width}x{height}+{x}+{y}')
+
+    def create_window_style(self):
+        """Build the card view and the grade buttons"""
+        main_container = ttk.Frame(self.root, style='Card.TFrame')
+        main_container.place(relx=0.5, rely=0.5, anchor='center', width=850, height=450)
+
+        header_frame = ttk.Frame(main_container, style='Card.TFrame')
+        header_frame.pack(fill='x', padx=40, pady=(30, 10))
+
+        title_label = ttk.Label(header_frame, text="Review", style='WindowTitle.TLabel')
+        title_label.pack(side='left')
+
+        self.progress_label = ttk.Label(header_frame, text="", style='Normal.TLabel')
+        self.progress_label.pack(side='right')
+
+        separator = tk.Frame(main_container, bg=self.colors['border'], height=1)
+        separator.pack(fill='x', padx=40, pady=10)
+
+        self.name_label = ttk.Label(
+            main_container,
+            text="",
+            style='Section.TLabel',
+            wraplength=760,
+            justify='center',
+            anchor='center'
+        )
+        self.name_label.pack(fill='x', padx=40, pady=(20, 10))
+
+        self.description_label = ttk.Label(
+            main_container,
+            text="",
+            style='Normal.TLabel',
+            wraplength=760,
+            justify='left',
+            anchor='nw'
+        )
+        self.description_label.pack(fill='both', expand=True, padx=40)
+
+        self.button_frame = ttk.Frame(main_container, style='Card.TFrame')
+        self.button_frame.pack(fill='x', padx=40, pady=(10, 30))
+
+        self.answer_button = ttk.Button(
+            self.button_frame,
+            text="Show answer (Space)",
+            style='Primary.TButton',
+            command=self.show_answer,
+            cursor='hand2'
+        )
+
+        self.grade_buttons = ttk.Frame(self.button_frame, style='Card.TFrame')
+        for grade, label in GRADES:
+            button = ttk.Button(
+                self.grade_buttons,
+                text=f"{grade} · {label}",
+                style='Success.TButton' if grade >= 3 else 'Danger.TButton',
+                command=lambda g=grade: self.grade(g),
+                cursor='hand2'
+            )
+            button.pack(side='left', expand=True, fill='x', padx=3)
+
+    def start_session(self):
+        """Start prefetching the cards that are due now"""
+        if self.queue is not None:
+            self.queue.stop()
+        if self.ready_queue is None:
+            self.ready_queue = MainLoopQueue(self.root, lambda items: self.show_next(), interval=15)
+        self.reviewed = 0
+        self.card = None
+        self.queue = ReviewQueue(self.store, self.prefetch, on_ready=lambda: self.ready_queue.put(True))
+        self.queue.start()
+        self.show_next()
+
+    def show_next(self):
+        """Put the next prefetched card on screen"""
+        with METRICS.timer('review.card_change'):
+            self.card = self.queue.next_card()
+            self.answer_shown = False
+            self.description_label.configure(text="")
+            if self.card is None:
+                self.show_empty()
+                return
+            self.name_label.configure(text=self.card.name)
+            self.update_progress()
+            self.grade_buttons.pack_forget()
+            self.answer_button.pack(fill='x')
+
+    def show_empty(self):
+        """Show the loading or end-of-session state"""
+        self.grade_buttons.pack_forget()
+        self.answer_button.pack_forget()
+        if self.queue.finished:
+            text = "Nothing due right now." if not self.reviewed else f"Session finished: {self.reviewed} card(s) reviewed."
+            self.name_label.configure(text=text)
+            self.progress_label.configure(text="")
+        else:
+            self.name_label.configure(text="Loading…")
+
+    def update_progress(self):
+        """Show the position of the current card in the session"""
+        total = self.queue.total
+        position = self.reviewed + 1
+        self.progress_label.configure(text=f"Card {position} of {total}" if total else f"Card {position}")
+
+    def show_answer(self):
+        """Reveal the description and offer the grades"""
+        if self.card is None or self.answer_shown:
+            return
+        self.answer_shown = True
+        self.description_label.configure(text=self.card.description or "(no description)")
+        self.answer_button.pack_forget()
+        self.grade_buttons.pack(fill='x')
+
+    def grade(self, grade):
+        """Journal the grade and move on; the store is updated by journal compaction"""
+        if self.card is None or not self.answer_shown:
+            return
+        self.journal.record_review(self.card.id, grade)
+        self.reviewed += 1
+        self.show_next()
+
+    def show(self):
+        """Show the window"""
+        self.root.deiconify()
+        self.root.focus_set()
+
+    def hide(self):
+        """Hide the window so it can be reused"""
+        self.root.withdraw()
+
+    def reset(self):
+        """Start a new session with the cards due now"""
+        self.start_session()
+
+    def close_window(self):
+        """Stop prefetching and hide the window"""
+        if self.queue is not None:
+            self.queue.stop()
+        if self.ready_queue is not None:
+            self.ready_queue.close()
+            self.ready_queue = None
+        self.hide()
@@ -0,0 +1,213 @@
+import collections
+import threading
+import time
+import numpy as np
+from task_store import DAY
+
+FORECAST_DAYS = 90
+RETENTION_DAYS = 30
+PASSING_GRADE = 3
+
+
+def local_day(timestamp):
+    """Local day number of a timestamp, using the UTC offset in force at that moment"""
+    return int((timestamp + time.localtime(timestamp).tm_gmtoff) // DAY)
+
+
+def local_days(timestamps):
+    """Local day numbers of an array of timestamps
+
+    The UTC offset is looked up once per UTC day the timestamps span; only timestamps on a day
+    whose offset changes (a DST switch) are looked up one by one.
+    """
+    stamps = np.asarray(timestamps, dtype=np.float64)
+    if not stamps.size:
+        return np.zeros(0, dtype=np.int64)
+    first = int(stamps.min() // DAY)
+    last = int(stamps.max() // DAY) + 1
+    edges = np.fromiter((time.localtime(day * DAY).tm_gmtoff for day in range(first, last + 1)),
+                        dtype=np.int64, count=last - first + 1)
+    utc_days = np.floor_divide(stamps, DAY).astype(np.int64) - first
+    offsets = edges[utc_days]
+    for index in np.flatnonzero(edges[utc_days + 1] != offsets):
+        offsets[index] = time.localtime(stamps[index]).tm_gmtoff
+    return np.floor_divide(stamps + offsets, DAY).astype(np.int64)
+
+
+def relative_due(due_day, today):
+    """Describe a due day relative to today: 'Overdue N days', 'Today', 'Tomorrow', 'In N days'"""
+    days = due_day - today
+    if days < 0:
+        return f"Overdue {-days} day" + ('s' if days < -1 else '')
+    if days == 0:
+        return "Today"
+    if days == 1:
+        return "Tomorrow"
+    return f"In {days} days"
+
+
+def due_label(next_review, now=None):
+    """Relative label of a due time, for callers without a ReviewStats"""
+    now = time.time() if now is None else now
+    return relative_due(local_day(next_review), local_day(now))
+
+
+class ReviewStats:
+    """Per-day counters of due cards, created cards and reviews, kept up to date from store events
+
+    Days are numbered from the epoch in local time, each timestamp with the UTC offset in force
+    at that moment so days stay aligned across DST switches. A full rebuild histograms the task table and
+    the review log with NumPy; afterwards every event adjusts a few counters, so reading the
+    forecast or the streaks costs O(days) whatever the size of the deck.
+
+    The old due day of an updated task is read from the task table, so on_store_change must be
+    subscribed before the table's own subscriber.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.due = collections.Counter()
+        self.created = collections.Counter()
+        self.reviews = collections.Counter()
+        self.passed = collections.Counter()
+        self._lock = threading.Lock()
+        self._changes_during_rebuild = None
+        self._last_seq = 0
+
+    def day(self, timestamp):
+        """Day number of a timestamp"""
+        return local_day(timestamp)
+
+    def days(self, timestamps):
+        """Day numbers of an array of timestamps"""
+        return local_days(timestamps)
+
+    def today(self):
+        return self.day(time.time())
+
+    @staticmethod
+    def histogram(days, weights=None):
+        """Counter of day -> count (or summed weights) computed with bincount"""
+        if len(days) == 0:
+            return collections.Counter()
+        first = int(days.min())
+        counts = np.bincount(days - first, weights=weights)
+        present = np.flatnonzero(counts)
+        return collections.Counter(dict(zip((present + first).tolist(), counts[present].astype(np.int64).tolist())))
+
+    def rebuild(self, store):
+        """Recompute every counter from the task table and the review log
+
+        Changes arriving meanwhile are buffered and applied to the new counters as the state they
+        leave behind, so it does not matter whether the snapshot already saw them: a task's due
+        and creation days move from their snapshot values to the new ones, and a review counts
+        unless the log read already had it. Local reviews are recognized by their sequence
+        number, which also catches those committed before the read but announced after the swap;
+        reviews synced from other devices by their timestamp.
+        """
+        with self._lock:
+            self._changes_during_rebuild = []
+        ids, created, next_review, _ = self.table.snapshot()
+        ids = np.frombuffer(ids, dtype=np.int64)
+        created = np.frombuffer(created, dtype=np.float64)
+        next_review = np.frombuffer(next_review, dtype=np.float64)
+        log = np.array(store.review_grades().fetchall(), dtype=np.float64).reshape(-1, 3)
+        review_days = self.days(log[:, 0])
+        passed = (log[:, 1] >= PASSING_GRADE).astype(np.float64)
+        local = log[~np.isnan(log[:, 2]), 2]
+        last_seq = int(local.max()) if len(local) else 0
+
+        due = self.histogram(self.days(next_review))
+        created_days = self.histogram(self.days(created))
+        reviews = self.histogram(review_days)
+        passes = self.histogram(review_days, passed)
+        with self._lock:
+            self.due, self.created, self.reviews, self.passed = due, created_days, reviews, passes
+            self._last_seq = last_seq
+            changes, self._changes_during_rebuild = self._changes_during_rebuild, None
+            if changes:
+                self._apply_buffered(changes, ids, created, next_review, np.sort(log[:, 0]))
+
+    def _apply_buffered(self, changes, ids, created, next_review, review_times):
+        """Bring freshly rebuilt counters up to date with the changes buffered while they were computed"""
+        tasks = {}
+        for event, rows in changes:
+            if event == 'review':
+                for seq, task_id, kind, grade, ts in rows:
+                    position = review_times.searchsorted(ts)
+                    if seq is None and position < len(review_times) and review_times[position] == ts:
+                        continue
+                    self._count_review(seq, grade, ts)
+            else:
+                for row in rows:
+                    tasks[row[0]] = row[3], row[4]
+        for task_id, (task_created, task_next_review) in tasks.items():
+            position = ids.searchsorted(task_id)
+            if position < len(ids) and ids[position] == task_id:
+                self.created[self.day(created[position])] -= 1
+                self.due[self.day(next_review[position])] -= 1
+            self.created[self.day(task_created)] += 1
+            self.due[self.day(task_next_review)] += 1
+
+    def _count_review(self, seq, grade, ts):
+        if seq is not None and seq <= self._last_seq:
+            return
+        day = self.day(ts)
+        self.reviews[day] += 1
+        if grade is not None and grade >= PASSING_GRADE:
+            self.passed[day] += 1
+
+    def on_store_change(self, event, rows):
+        """Store subscriber that adjusts the counters by one event"""
+        with self._lock:
+            if self._changes_during_rebuild is not None and event in ('add', 'update', 'review'):
+                self._changes_during_rebuild.append((event, rows))
+            if event == 'add':
+                for row in rows:
+                    self.created[self.day(row[3])] += 1
+                    self.due[self.day(row[4])] += 1
+            elif event == 'update':
+                for row in rows:
+                    position = self.table.index(row[0])
+                    if position >= 0:
+                        self.due[self.day(self.table.next_review[position])] -= 1
+                    self.due[self.day(row[4])] += 1
+            elif event == 'review':
+                for seq, task_id, kind, grade, ts in rows:
+                    self._count_review(seq, grade, ts)
+
+    def forecast(self, days=FORECAST_DAYS):
+        """Return (overdue, [due on each of the next `days` days starting today])"""
+        today = self.today()
+        with self._lock:
+            overdue = sum(count for day, count in self.due.items() if day < today)
+            return overdue, [self.due.get(today + offset, 0) for offset in range(days)]
+
+    def retention(self, days=RETENTION_DAYS):
+        """Share of reviews graded as passed over the last `days` days, or None without reviews"""
+        today = self.today()
+        with self._lock:
+            reviews = sum(self.reviews.get(today - offset, 0) for offset in range(days))
+            passed = sum(self.passed.get(today - offset, 0) for offset in range(days))
+        return passed / reviews if reviews else None
+
+    def streaks(self):
+        """Return (current, longest) runs of consecutive days with at least one review
+
+        The current streak still counts when today has no reviews yet but yesterday had.
+        """
+        today = self.today()
+        with self._lock:
+            days = sorted(day for day, count in self.reviews.items() if count > 0)
+        longest = run = 0
+        previous = None
+        for day in days:
+            run = run + 1 if previous is not None and day == previous + 1 else 1
+            longest = max(longest, run)
+            previous = day
+        current = run if previous is not None and previous >= today - 1 else 0
+        return current, longest
+
+    def due_label(self, next_review, today=None):
+        """Relative label of a due time for table cells"""
+        return relative_due(self.day(next_review), self.today() if today is None else today)
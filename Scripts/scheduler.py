@@ -0,0 +1,115 @@
+import heapq
+import itertools
+import threading
+import time
+from instrumentation import METRICS
+
+
+class ReviewScheduler:
+    """Background thread that fires due reviews from a min-heap keyed by due time"""
+
+    def __init__(self, on_due, clock=time.time):
+        self.on_due = on_due
+        self.clock = clock
+
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def load(self, schedule):
+        """Replace the queue with (task_id, due) pairs"""
+        with self._cond:
+            self._due = dict(schedule)
+            self._heap = [(due, next(self._counter), task_id) for task_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def schedule(self, task_id, due):
+        """Add a task or move it to a new due time"""
+        with self._cond:
+            self._due[task_id] = due
+            heapq.heappush(self._heap, (due, next(self._counter), task_id))
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._compact()
+            if self._heap[0][2] == task_id:
+                self._cond.notify()
+
+    def cancel(self, task_id):
+        """Forget a task; its heap entry is dropped lazily"""
+        with self._cond:
+            self._due.pop(task_id, None)
+
+    def __len__(self):
+        return len(self._due)
+
+    def next_due(self):
+        """Return the earliest due time or None"""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='review-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread and wait for it"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due_ids = self._wait_for_due()
+            if due_ids is None:
+                return
+            METRICS.count('scheduler.fired', len(due_ids))
+            with METRICS.timer('scheduler.dispatch'):
+                self.on_due(due_ids)
+
+    def _wait_for_due(self):
+        """Sleep until something is due; return the due ids, or None when stopped"""
+        while self._running:
+            self._drop_stale()
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            delay = self._heap[0][0] - self.clock()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+
+            now = self.clock()
+            METRICS.count('scheduler.wakeups')
+            if METRICS.enabled:
+                METRICS.record('scheduler.lateness', (now - self._heap[0][0]) * 1000)
+            due_ids = []
+            while self._heap and self._heap[0][0] <= now:
+                due, _, task_id = heapq.heappop(self._heap)
+                if self._due.get(task_id) == due:
+                    del self._due[task_id]
+                    due_ids.append(task_id)
+            if due_ids:
+                return due_ids
+        return None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._due.get(entry[2]) == entry[0]]
+        heapq.heapify(self._heap)
@@ -0,0 +1,180 @@
+import bisect
+import re
+import threading
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchIndex:
+    """Incremental inverted index from name/description tokens to task ids"""
+
+    def __init__(self):
+        self._postings = {}
+        self._tokens = []
+        self._task_tokens = {}
+        self._initials = {}
+        self._new_tokens = None
+        self._lock = threading.Lock()
+        self._last_query = None
+        self._last_result = None
+
+    @classmethod
+    def from_store(cls, store):
+        """Build an index over every task in the store"""
+        index = cls()
+        index.build(store)
+        return index
+
+    def build(self, store, chunk_size=5000):
+        """Index every task of the store in chunks so searches are not blocked for long
+
+        Terms first seen during the build are collected in a set and sorted into the vocabulary
+        once at the end; until then only one-letter prefixes find them.
+        """
+        with self._lock:
+            self._new_tokens = set()
+        try:
+            cursor = store.all_tasks()
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                self.add_many(rows)
+        finally:
+            with self._lock:
+                self._tokens = sorted(self._new_tokens.union(self._tokens))
+                self._new_tokens = None
+                self._last_query = None
+
+    def rebuild(self, store):
+        """Re-index the whole store, swapping the new index in when it is complete"""
+        fresh = SearchIndex.from_store(store)
+        with self._lock:
+            self._postings = fresh._postings
+            self._tokens = fresh._tokens
+            self._task_tokens = fresh._task_tokens
+            self._initials = fresh._initials
+            self._last_query = None
+
+    def add_many(self, rows):
+        """Index store rows (id, name, description, ...)"""
+        with self._lock:
+            for row in rows:
+                self._add(row[0], row[1], row[2])
+            self._last_query = None
+
+    def remove(self, task_id):
+        """Drop a task from the index"""
+        with self._lock:
+            self._remove(task_id)
+            self._last_query = None
+
+    def on_store_change(self, event, rows):
+        """Store subscriber that keeps the index current"""
+        if event in ('add', 'update'):
+            self.add_many(rows)
+
+    def __len__(self):
+        return len(self._task_tokens)
+
+    def search(self, query):
+        """Return the set of task ids matching every word of the query (the last word is a prefix)
+
+        Returns None for an empty query. The returned set is shared with the index cache
+        and must not be modified.
+        """
+        words = tokenize(query)
+        if not words:
+            return None
+
+        with self._lock:
+            key = tuple(words)
+            if key == self._last_query:
+                return self._last_result
+
+            result = None
+            for word in sorted(words[:-1], key=self._posting_size):
+                result = self._intersect(result, self._postings.get(word, ()))
+                if not result:
+                    break
+            if result is None or result:
+                result = self._intersect(result, self._prefix_ids(words[-1], result))
+
+            self._last_query = key
+            self._last_result = result
+            return result
+
+    def _add(self, task_id, name, description):
+        tokens = set(tokenize(f'{name}\n{description}'))
+        old = self._task_tokens.get(task_id)
+        if old is not None:
+            for token in old - tokens:
+                self._discard(token, task_id)
+            for initial in {token[0] for token in old}:
+                self._initials[initial].discard(task_id)
+            tokens_to_add = tokens - old
+        else:
+            tokens_to_add = tokens
+        for initial in {token[0] for token in tokens}:
+            self._initials.setdefault(initial, set()).add(task_id)
+        for token in tokens_to_add:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                if self._new_tokens is not None:
+                    self._new_tokens.add(token)
+                else:
+                    bisect.insort(self._tokens, token)
+            posting.add(task_id)
+        self._task_tokens[task_id] = tokens
+
+    def _remove(self, task_id):
+        for token in self._task_tokens.pop(task_id, ()):
+            self._discard(token, task_id)
+            self._initials[token[0]].discard(task_id)
+
+    def _discard(self, token, task_id):
+        posting = self._postings[token]
+        posting.discard(task_id)
+        if not posting:
+            del self._postings[token]
+            if self._new_tokens is not None and token in self._new_tokens:
+                self._new_tokens.discard(token)
+            else:
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def _posting_size(self, token):
+        return len(self._postings.get(token, ()))
+
+    def _prefix_ids(self, prefix, candidates):
+        """Collect ids of every token starting with prefix"""
+        if len(prefix) == 1:
+            return self._initials.get(prefix, ())
+
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = bisect.bisect_left(self._tokens, prefix + '\uffff')
+        if end - start == 1:
+            return self._postings[self._tokens[start]]
+        if candidates is not None and len(candidates) < end - start:
+            task_tokens = self._task_tokens
+            return {task_id for task_id in candidates
+                    if any(token.startswith(prefix) for token in task_tokens[task_id])}
+
+        ids = set()
+        for token in self._tokens[start:end]:
+            posting = self._postings[token]
+            if candidates is not None:
+                posting = posting & candidates if len(posting) > len(candidates) else candidates & posting
+            ids |= posting
+        return ids
+
+    @staticmethod
+    def _intersect(result, ids):
+        if result is None:
+            return set(ids)
+        return result & ids if len(result) <= len(ids) else ids & result
@@ -1,128 +1,69 @@
+import csv
+import functools
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog, messagebox
+from task_store import DAY, KeysetPager, TaskFilter, TaskStore, day_start
+from importer import import_file
+from exporter import export_file
+from tk_queue import MainLoopQueue
+from task_model import TaskRecord
+from loader import AsyncPageSource, LatestRequestWorker
+from virtual_table import IdListSource, VirtualTable
+from review_stats import due_label
+from theme import COLORS, setup_theme
 
 
 class ListTasks:
     """Window for displaying all tracked tasks"""
 
-    def __init__(self, main_root):
+    # Table column -> store sort key
+    SORT_KEYS = {
+        'ID': 'id',
+        'Task Name': 'name',
+        'Created': 'created',
+        'Near repetition': 'next_review',
+        'Repeated': 'repeated'
+    }
+
+    FILTERS = ('All tasks', 'Due today', 'Overdue', 'New (0 repeats)',
+               'Learning (1-3 repeats)', 'Mature (4+ repeats)')
+
+    def __init__(self, main_root, store=None, search_index=None, stats=None, task_table=None):
         self.main_root = main_root
+        self.store = store or TaskStore()
+        self.search_index = search_index
+        self.stats = stats
+        self.task_table = task_table
+        self.stats_window = None
+        self.search_query = tk.StringVar()
+        self.source = None
+        self.table_view = None
+        self.search_worker = None
+        self.import_cancel = None
+        self.sort_column = 'ID'
+        self.sort_descending = False
+        self.filter_name = tk.StringVar(value=self.FILTERS[0])
 
         self.root = tk.Toplevel(main_root)
         self.root.title("Task Tracking")
-        self.root.geometry("1000x600")
         self.root.resizable(False, False)
 
         self.root.transient(main_root)
-        self.root.grab_set()
+        self.root.protocol('WM_DELETE_WINDOW', self.close_window)
 
-        self.colors = {
-            'bg': '#0f172a',
-            'card': '#1e293b',
-            'primary': '#3b82f6',
-            'secondary': '#8b5cf6',
-            'text': '#f1f5f9',
-            'button_text': '#0f172a',
-            'text_secondary': '#94a3b8',
-            'border': '#334155',
-            'success': '#10b981',
-            'danger': '#ef4444',
-            'input_bg': '#2d3748',
-            'input_border': '#4a5568',
-            'hover': '#475569',
-            'tabel': '#000000'
-        }
+        self.colors = COLORS
 
         self.root.configure(bg=self.colors['bg'])
-        self.setup_styles()
-        self.center_window()
+        setup_theme(self.root)
+        self.center_window(1000, 600)
         self.create_window_style()
 
-        self.load_demo_data()
-
-    def setup_styles(self):
-        """Setup styles for minimalist design"""
-        style = ttk.Style()
-
-        # Style for window title
-        style.configure('WindowTitle.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text'],
-                        font=('Segoe UI', 24, 'bold'),
-                        padding=10)
-
-        # Style for section titles
-        style.configure('Section.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text'],
-                        font=('Segoe UI', 14, 'bold'),
-                        padding=5)
-
-        # Style for normal text
-        style.configure('Normal.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text_secondary'],
-                        font=('Segoe UI', 11),
-                        padding=2)
-
-        # Style for cards/frames
-        style.configure('Card.TFrame',
-                        background=self.colors['card'],
-                        relief='flat',
-                        borderwidth=0)
-
-        # Style for primary buttons
-        style.configure('Primary.TButton',
-                        background=self.colors['primary'],
-                        foreground=self.colors['button_text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 12, 'bold'),
-                        padding=10)
-        style.map('Primary.TButton',
-                  background=[('active', '#2563eb')])
-
-        # Style for danger buttons
-        style.configure('Danger.TButton',
-                        background=self.colors['danger'],
-                        foreground=self.colors['text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 10, 'bold'),
-                        padding=8)
-        style.map('Danger.TButton',
-                  background=[('active', '#dc2626')])
-
-        # Style for success buttons
-        style.configure('Success.TButton',
-                        background=self.colors['success'],
-                        foreground=self.colors['text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 10, 'bold'),
-                        padding=8)
-        style.map('Success.TButton',
-                  background=[('active', '#059669')])
-
-        # Style for Treeview
-        style.configure('Custom.Treeview',
-                        background=self.colors['text'],
-                        foreground=self.colors['tabel'],
-                        fieldbackground=self.colors['text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 10))
-
-        style.configure('Custom.Treeview.Heading',
-                        background=self.colors['input_bg'],
-                        foreground=self.colors['tabel'],
-                        relief='flat',
-                        font=('Segoe UI', 11, 'bold'))
-
-        style.map('Custom.Treeview.Heading',
-                  background=[('active', self.colors['border'])])
-
-    def center_window(self):
-        """Center the window on screen"""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
+        self.load_data()
+
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
         x = (self.root.winfo_screenwidth() // 2) - (width // 2)
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
@@ -158,14 +99,44 @@ class ListTasks:
         toolbar_frame = ttk.Frame(main_container, style='Card.TFrame')
         toolbar_frame.pack(fill='x', padx=30, pady=(0, 15))
 
+        if self.search_index is not None:
+            search_label = ttk.Label(toolbar_frame, text="Search:", style='Normal.TLabel')
+            search_label.pack(side='left', padx=(0, 8))
+
+            search_entry = tk.Entry(
+                toolbar_frame,
+                bg=self.colors['input_bg'],
+                fg=self.colors['text'],
+                insertbackground=self.colors['text'],
+                font=('Segoe UI', 11),
+                relief='flat',
+                width=40,
+                textvariable=self.search_query
+            )
+            search_entry.pack(side='left', ipady=4)
+            self.search_query.trace_add('write', lambda *args: self.apply_search())
+
+        filter_box = ttk.Combobox(
+            toolbar_frame,
+            textvariable=self.filter_name,
+            values=self.FILTERS,
+            state='readonly',
+            width=22
+        )
+        filter_box.pack(side='left', padx=(15, 0))
+        filter_box.bind('<<ComboboxSelected>>', lambda e: self.load_data())
+
+        self.progress_bar = ttk.Progressbar(toolbar_frame, mode='indeterminate', length=120)
+        self.progress_label = ttk.Label(toolbar_frame, text="Loading...", style='Normal.TLabel')
+
         table_frame = ttk.Frame(main_container, style='Card.TFrame')
         table_frame.pack(fill='both', expand=True, padx=30, pady=(0, 20))
 
         table_container = tk.Frame(table_frame, bg=self.colors['card'])
         table_container.pack(fill='both', expand=True)
 
-        v_scrollbar = ttk.Scrollbar(table_container)
-        v_scrollbar.pack(side='right', fill='y')
+        self.v_scrollbar = ttk.Scrollbar(table_container)
+        self.v_scrollbar.pack(side='right', fill='y')
 
         h_scrollbar = ttk.Scrollbar(table_container, orient='horizontal')
         h_scrollbar.pack(side='bottom', fill='x')
@@ -173,13 +144,11 @@ class ListTasks:
         self.tasks_table = ttk.Treeview(
             table_container,
             style='Custom.Treeview',
-            yscrollcommand=v_scrollbar.set,
             xscrollcommand=h_scrollbar.set,
             selectmode='extended',
             height=15
         )
 
-        v_scrollbar.config(command=self.tasks_table.yview)
         h_scrollbar.config(command=self.tasks_table.xview)
 
         self.tasks_table['columns'] = ('ID', 'Task Name', 'Description', 'Created', 'Near repetition', 'Repeated')
@@ -200,20 +169,298 @@ class ListTasks:
         self.tasks_table.heading('Near repetition', text='Near repetition', anchor='center')
         self.tasks_table.heading('Repeated', text='Repeated', anchor='center')
 
+        for column in self.SORT_KEYS:
+            self.tasks_table.heading(column, command=functools.partial(self.sort_by, column))
+        self.update_sort_headings()
+
         self.tasks_table.pack(fill='both', expand=True)
 
         button_frame = ttk.Frame(main_container, style='Card.TFrame')
         button_frame.pack(fill='x', padx=30, pady=(0, 25))
 
-    def load_demo_data(self):
-        """Load demo tasks into the table"""
-        item_id = self.tasks_table.insert(
-            '',
-            'end',
-            values=(1, "Learn Python OOP", "Object-oriented programming concepts", "2024-01-15", "Tommorow", "2"),
+        self.import_button = ttk.Button(
+            button_frame,
+            text="Import deck...",
+            style='Success.TButton',
+            command=self.import_deck,
+            cursor='hand2'
+        )
+        self.import_button.pack(side='left')
+
+        self.export_button = ttk.Button(
+            button_frame,
+            text="Export...",
+            style='Success.TButton',
+            command=self.export_deck,
+            cursor='hand2'
         )
+        self.export_button.pack(side='left', padx=(10, 0))
+
+        if self.stats is not None:
+            stats_button = ttk.Button(
+                button_frame,
+                text="Statistics",
+                style='Success.TButton',
+                command=self.show_stats,
+                cursor='hand2'
+            )
+            stats_button.pack(side='left', padx=(10, 0))
+
+        self.status_label = ttk.Label(button_frame, text="", style='Normal.TLabel')
+        self.status_label.pack(side='left', padx=15)
+
+    def load_data(self):
+        """Show tracked tasks, fetching the visible rows on a worker thread"""
+        if self.source is not None:
+            self.source.cancel()
+        pager = KeysetPager(self.store, self.SORT_KEYS[self.sort_column], self.sort_descending,
+                            self.current_filter())
+        self.source = AsyncPageSource(
+            self.root,
+            pager.count,
+            functools.partial(self.fetch_page, pager),
+            self.on_rows_loaded,
+            on_busy=self.set_loading,
+            on_exit=self.store.release
+        )
+        if self.table_view is None:
+            self.table_view = VirtualTable(
+                self.tasks_table,
+                self.v_scrollbar,
+                self.source,
+                self.format_row
+            )
+        elif self.search_query.get().strip():
+            self.apply_search()
+        else:
+            self.table_view.set_source(self.source)
+
+    def current_filter(self):
+        """Translate the selected filter into store conditions"""
+        name = self.filter_name.get()
+        today = day_start(time.time())
+        if name == 'Due today':
+            return TaskFilter(due_from=today, due_before=today + DAY)
+        if name == 'Overdue':
+            return TaskFilter(due_before=today)
+        if name == 'New (0 repeats)':
+            return TaskFilter(repeated_max=0)
+        if name == 'Learning (1-3 repeats)':
+            return TaskFilter(repeated_min=1, repeated_max=3)
+        if name == 'Mature (4+ repeats)':
+            return TaskFilter(repeated_min=4)
+        return TaskFilter()
+
+    def sort_by(self, column):
+        """Sort by a column, toggling the direction on repeated clicks"""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.update_sort_headings()
+        self.load_data()
+
+    def update_sort_headings(self):
+        """Mark the sorted column with an arrow"""
+        for column in self.SORT_KEYS:
+            arrow = ''
+            if column == self.sort_column:
+                arrow = ' ▼' if self.sort_descending else ' ▲'
+            self.tasks_table.heading(column, text=column + arrow)
+
+    def apply_search(self):
+        """Filter the table by the search box; the hits are looked up and sorted on a worker thread"""
+        if self.search_worker is None:
+            self.search_worker = LatestRequestWorker(self.root, self.run_search, self.on_search_results,
+                                                     on_exit=self.store.release, name='task-search')
+        self.search_worker.submit((self.search_query.get(), self.SORT_KEYS[self.sort_column],
+                                   self.sort_descending, self.current_filter()))
+
+    def run_search(self, request):
+        """Return the matching ids in table order, or None for an empty query; runs off the Tk thread
+
+        The hits are sorted and filtered in the task table once it is loaded, so only the rows on
+        screen are read from the store.
+        """
+        query, sort, descending, task_filter = request
+        task_ids = self.search_index.search(query)
+        if task_ids is None:
+            return None
+        if self.task_table is not None and self.task_table.loaded:
+            return self.task_table.filter_ids(task_ids, sort, descending, task_filter)
+        return self.store.filter_ids(task_ids, sort, descending, task_filter)
+
+    def on_search_results(self, ordered):
+        """Show the hits of the newest search"""
+        if ordered is None:
+            self.table_view.set_source(self.source)
+        else:
+            self.table_view.set_source(IdListSource(self.fetch_records, ordered))
+
+    def on_rows_loaded(self):
+        """Redraw the table after a batch of rows arrived"""
+        if self.table_view.source is self.source:
+            self.table_view.refresh()
+
+    def set_loading(self, loading):
+        """Show or hide the loading indicator"""
+        if loading and not self.progress_bar.winfo_manager():
+            self.progress_bar.pack(side='right')
+            self.progress_label.pack(side='right', padx=(0, 10))
+            self.progress_bar.start(15)
+        elif not loading and self.progress_bar.winfo_manager():
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+            self.progress_label.pack_forget()
+
+    def fetch_page(self, pager, offset, limit):
+        """Read one page of task records; descriptions are loaded when a row is shown"""
+        return [TaskRecord.from_summary(self.store, row) for row in pager.page(offset, limit)]
+
+    def fetch_records(self, task_ids):
+        """Read the task records for a list of ids"""
+        return [TaskRecord.from_summary(self.store, row) for row in self.store.get_summaries(task_ids)]
+
+    def format_row(self, record):
+        """Convert a task record into a Treeview item id and values"""
+        values = (record.id, record.name, record.preview(), self.format_date(record.created),
+                  self.format_due(record.next_review), record.repeated)
+        return str(record.id), values
+
+    def format_due(self, next_review):
+        """Describe the next review relative to today"""
+        if self.stats is not None:
+            return self.stats.due_label(next_review)
+        return due_label(next_review)
+
+    def show_stats(self):
+        """Show the review forecast and statistics"""
+        from stats_window import StatsWindow
+
+        if self.stats_window is None:
+            self.stats_window = StatsWindow(self.root, self.stats)
+        self.stats_window.show()
+
+    @staticmethod
+    def format_date(timestamp):
+        """Format a unix timestamp as a calendar date"""
+        return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+    def import_deck(self):
+        """Ask for a deck file and import it on a worker thread"""
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            title="Import deck",
+            filetypes=[("Deck files", "*.csv *.tsv *.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        self.import_button.state(['disabled'])
+        self.status_label.configure(text="Importing...")
+        self.import_cancel = threading.Event()
+        self.import_queue = MainLoopQueue(self.root, self.on_import_progress)
+        threading.Thread(target=self.run_import, args=(path,), name='deck-import', daemon=True).start()
+
+    def run_import(self, path):
+        """Import a deck file; runs off the Tk thread"""
+        try:
+            import_file(self.store, path, progress=self.import_queue.put, cancel=self.import_cancel)
+        except (OSError, csv.Error) as error:
+            self.import_queue.put(error)
+        finally:
+            self.store.release()
+
+    def on_import_progress(self, updates):
+        """Show import progress and report the result"""
+        stats = updates[-1]
+        if isinstance(stats, Exception):
+            self.finish_import()
+            messagebox.showerror("Import failed", str(stats), parent=self.root)
+            return
+
+        self.status_label.configure(text=f"Imported {stats.imported:,} tasks ({stats.fraction:.0%})")
+        if stats.finished:
+            self.finish_import()
+            self.load_data()
+            if not stats.cancelled:
+                messagebox.showinfo(
+                    "Import finished",
+                    f"Imported {stats.imported:,} tasks.\n"
+                    f"Skipped {stats.duplicates:,} duplicates and {stats.invalid:,} invalid rows.",
+                    parent=self.root
+                )
+
+    def finish_import(self):
+        """Re-enable importing after a run ended"""
+        self.import_queue.close()
+        self.import_button.state(['!disabled'])
+        self.import_cancel = None
+
+    def export_deck(self):
+        """Ask for a target file and export every task on a worker thread"""
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Export deck",
+            defaultextension='.csv',
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Snapshot", "*.blsnap")]
+        )
+        if not path:
+            return
+
+        self.export_button.state(['disabled'])
+        self.status_label.configure(text="Exporting...")
+        self.export_queue = MainLoopQueue(self.root, self.on_export_progress)
+        threading.Thread(target=self.run_export, args=(path,), name='deck-export', daemon=True).start()
+
+    def run_export(self, path):
+        """Export the deck; runs off the Tk thread"""
+        try:
+            count = export_file(self.store, path, progress=lambda done: self.export_queue.put(('progress', done)))
+            self.export_queue.put(('done', count))
+        except (OSError, ValueError) as error:
+            self.export_queue.put(('error', error))
+        finally:
+            self.store.release()
+
+    def on_export_progress(self, updates):
+        """Show export progress and report the result"""
+        kind, value = updates[-1]
+        if kind == 'progress':
+            self.status_label.configure(text=f"Exported {value:,} tasks...")
+            return
+
+        self.export_queue.close()
+        self.export_button.state(['!disabled'])
+        if kind == 'error':
+            self.status_label.configure(text="")
+            messagebox.showerror("Export failed", str(value), parent=self.root)
+        else:
+            self.status_label.configure(text=f"Exported {value:,} tasks")
+
+    def show(self):
+        """Show the window and make it modal"""
+        self.root.deiconify()
+        self.root.grab_set()
+
+    def hide(self):
+        """Hide the window so it can be reused"""
+        self.root.grab_release()
+        self.root.withdraw()
+
+    def reset(self):
+        """Reload the tasks for a reused window"""
+        self.load_data()
+        self.search_query.set('')
 
     def close_window(self):
         """Close the tasks window"""
-        self.root.grab_release()
-        self.root.destroy()
+        if self.import_cancel is not None:
+            self.import_cancel.set()
+        self.source.cancel()
+        if self.search_worker is not None:
+            self.search_worker.close()
+            self.search_worker = None
+        self.set_loading(False)
+        self.hide()
@@ -0,0 +1,29 @@
+import sys
+import time
+
+
+class StartupProfile:
+    """Prints how long each startup phase took, for main.py --profile-startup
+
+    Phases finished on background threads (loading the task table, building the search
+    index) are measured from the same starting point, so their lines show when they ended.
+    """
+
+    def __init__(self, started=None, stream=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.stream = stream or sys.stderr
+
+    def mark(self, phase):
+        """Close the current phase under the given name and print it"""
+        now = time.perf_counter()
+        duration, self.last = now - self.last, now
+        self.stream.write(f'{phase:<24} {duration * 1000:8.1f} ms {(now - self.started) * 1000:9.1f} ms total\n')
+        self.stream.flush()
+
+
+class NoProfile:
+    """Stand-in used when startup is not being profiled"""
+
+    def mark(self, phase):
+        pass
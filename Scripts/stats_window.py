@@ -0,0 +1,114 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+from review_stats import FORECAST_DAYS, RETENTION_DAYS
+from theme import COLORS, setup_theme
+
+
+class StatsWindow:
+    """Review load forecast for the next 90 days, retention and streaks"""
+
+    CHART_WIDTH = 760
+    CHART_HEIGHT = 220
+
+    def __init__(self, parent, stats):
+        self.parent = parent
+        self.stats = stats
+
+        self.root = tk.Toplevel(parent)
+        self.root.title("Statistics")
+        self.root.resizable(False, False)
+
+        self.root.transient(parent)
+        self.root.protocol('WM_DELETE_WINDOW', self.close_window)
+
+        self.colors = COLORS
+
+        self.root.configure(bg=self.colors['bg'])
+        setup_theme(self.root)
+        self.center_window(850, 450)
+        self.create_window_style()
+
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'{width}x{height}+{x}+{y}')
+
+    def create_window_style(self):
+        """Build the summary line and the forecast chart"""
+        main_container = ttk.Frame(self.root, style='Card.TFrame')
+        main_container.pack(fill='both', expand=True, padx=20, pady=20)
+
+        title_label = ttk.Label(main_container, text="Statistics", style='WindowTitle.TLabel')
+        title_label.pack(anchor='w')
+
+        self.summary_label = ttk.Label(main_container, text="", style='Normal.TLabel')
+        self.summary_label.pack(anchor='w', pady=(0, 10))
+
+        chart_title = ttk.Label(main_container, text=f"Due per day, next {FORECAST_DAYS} days",
+                                style='Section.TLabel')
+        chart_title.pack(anchor='w')
+
+        self.chart = tk.Canvas(
+            main_container,
+            width=self.CHART_WIDTH,
+            height=self.CHART_HEIGHT,
+            bg=self.colors['input_bg'],
+            highlightthickness=0
+        )
+        self.chart.pack(pady=(5, 0))
+
+    def refresh(self):
+        """Redraw from the cached counters; no deck scan"""
+        overdue, forecast = self.stats.forecast()
+        retention = self.stats.retention()
+        current, longest = self.stats.streaks()
+        retention_text = f"{retention:.0%}" if retention is not None else "–"
+        self.summary_label.configure(
+            text=f"Overdue: {overdue}    Due today: {forecast[0]}    "
+                 f"Retention ({RETENTION_DAYS} days): {retention_text}    "
+                 f"Streak: {current} day(s), longest {longest}"
+        )
+        self.draw_chart(forecast)
+
+    def draw_chart(self, forecast):
+        """Draw one bar per day, scaled to the busiest day"""
+        chart = self.chart
+        chart.delete('all')
+        top, bottom, left = 20, self.CHART_HEIGHT - 20, 10
+        peak = max(forecast) or 1
+        bar = (self.CHART_WIDTH - 2 * left) / len(forecast)
+        for index, count in enumerate(forecast):
+            if count:
+                x = left + index * bar
+                height = (bottom - top) * count / peak
+                chart.create_rectangle(x + 1, bottom - height, x + bar - 1, bottom,
+                                       fill=self.colors['primary'], width=0)
+        chart.create_text(left, top - 10, text=f"max {peak}", anchor='w',
+                          fill=self.colors['text_secondary'], font='BLTable')
+        for offset in range(0, len(forecast), 30):
+            label = time.strftime('%d %b', time.localtime(time.time() + offset * 86400))
+            chart.create_text(left + offset * bar, bottom + 10, text=label, anchor='w',
+                              fill=self.colors['text_secondary'], font='BLTable')
+
+    def show(self):
+        """Show the window above the task list"""
+        self.refresh()
+        self.root.deiconify()
+        self.root.grab_set()
+
+    def hide(self):
+        """Hide the window and hand the input grab back to the task list"""
+        self.root.grab_release()
+        self.root.withdraw()
+        if self.parent.winfo_viewable():
+            self.parent.grab_set()
+
+    def reset(self):
+        """Nothing to clear for a reused window"""
+        pass
+
+    def close_window(self):
+        """Hide the window"""
+        self.hide()
@@ -0,0 +1,290 @@
+"""Delta sync of tasks and reviews between devices through a hub server
+
+Every request carries the changes this device made since its last sync and asks for the changes
+other devices made since the server sequence number it saw last:
+
+    request   {version, device, cursor, limit, tasks: [...], reviews: [...]}
+    response  {version, cursor, more, tasks: [...], reviews: [...]}
+
+tasks are [uid, name, description, created, modified, device, next_review] and reviews are
+[device, seq, uid, grade, ts], where seq is the review's sequence number on the device that
+made it. Bodies are zlib-compressed JSON and both directions are batched, so a day of reviews
+moves a few kilobytes however large the deck is.
+
+Text edits resolve last writer wins on (modified, device). Reviews never conflict: each device
+keeps all of them and reschedules a task by replaying its reviews in (ts, device, seq) order.
+
+    python sync.py serve --port 8765 --data hub.db     run the reference server on localhost
+"""
+import argparse
+import http.server
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+import zlib
+
+PROTOCOL_VERSION = 1
+BATCH_SIZE = 2000
+CONTENT_TYPE = 'application/x-better-learning-sync'
+
+
+class SyncError(Exception):
+    """The server could not be reached or rejected a request"""
+
+
+def encode(message):
+    """Serialize a message as zlib-compressed JSON"""
+    return zlib.compress(json.dumps(message, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def decode(body):
+    """Parse a message written by encode"""
+    return json.loads(zlib.decompress(body).decode('utf-8'))
+
+
+class SyncReport:
+    """What one sync moved, including the compressed bytes on the wire"""
+
+    def __init__(self):
+        self.sent_tasks = 0
+        self.sent_reviews = 0
+        self.received_tasks = 0
+        self.received_reviews = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.requests = 0
+
+    def __str__(self):
+        return (f"sent {self.sent_tasks} task(s) and {self.sent_reviews} review(s), "
+                f"received {self.received_tasks} task(s) and {self.received_reviews} review(s); "
+                f"{self.bytes_sent + self.bytes_received:,} bytes in {self.requests} request(s)")
+
+
+class SyncClient:
+    """Syncs a task store with a hub server
+
+    The last server sequence number seen is kept per server URL in the store's meta table,
+    next to the last local task ('sync_task_id') and review ('sync_review_seq') that were sent;
+    edited tasks wait in sync_pending.
+    """
+
+    def __init__(self, store, url, batch_size=BATCH_SIZE, timeout=30.0):
+        self.store = store
+        self.url = url.rstrip('/') + '/sync'
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.cursor_key = f'sync_cursor {url}'
+
+    def sync(self):
+        """Exchange changes until both sides are up to date; returns a SyncReport"""
+        from intervals import review
+
+        report = SyncReport()
+        device = self.store.device_id()
+        cursor = self.store.meta(self.cursor_key, 0)
+        review_seq = self.store.meta('sync_review_seq', 0)
+        while True:
+            new, edited = self.store.pending_tasks(self.batch_size)
+            tasks = new + edited
+            reviews = self.store.local_reviews(review_seq, self.batch_size)
+            response = self.post(report, {
+                'version': PROTOCOL_VERSION,
+                'device': device,
+                'cursor': cursor,
+                'limit': self.batch_size,
+                'tasks': [[uid, name, description, created, modified, origin or device, next_review]
+                          for task_id, uid, name, description, created, modified, origin, next_review in tasks],
+                'reviews': [[device, seq, uid, grade, ts] for seq, uid, grade, ts in reviews]
+            })
+            if reviews:
+                review_seq = reviews[-1][0]
+            self.store.mark_synced(new, edited, review_seq)
+
+            # Local reviews of tasks that other devices also reviewed are replayed in merged order
+            changed, logged = self.store.apply_remote(
+                response['tasks'], response['reviews'], review, replay={row[1] for row in reviews}
+            )
+            cursor = response['cursor']
+            self.store.set_meta(self.cursor_key, cursor)
+
+            report.sent_tasks += len(tasks)
+            report.sent_reviews += len(reviews)
+            report.received_tasks += len(response['tasks'])
+            report.received_reviews += logged
+            if len(tasks) < self.batch_size and len(reviews) < self.batch_size and not response['more']:
+                return report
+
+    def post(self, report, message):
+        """Send one request and return the decoded answer, counting the bytes in the report"""
+        body = encode(message)
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': CONTENT_TYPE})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                answer = response.read()
+        except urllib.error.HTTPError as error:
+            raise SyncError(f"server refused the sync: {error.code} {error.read().decode('utf-8', 'replace')}")
+        except (urllib.error.URLError, OSError) as error:
+            raise SyncError(f"cannot reach {self.url}: {error}")
+        report.requests += 1
+        report.bytes_sent += len(body)
+        report.bytes_received += len(answer)
+        return decode(answer)
+
+
+SERVER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    uid         TEXT    PRIMARY KEY,
+    name        TEXT    NOT NULL,
+    description TEXT    NOT NULL,
+    created     REAL    NOT NULL,
+    modified    REAL    NOT NULL,
+    device      TEXT    NOT NULL,
+    next_review REAL    NOT NULL,
+    seq         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_seq ON tasks (seq);
+CREATE TABLE IF NOT EXISTS reviews (
+    device     TEXT    NOT NULL,
+    device_seq INTEGER NOT NULL,
+    uid        TEXT    NOT NULL,
+    grade      INTEGER NOT NULL,
+    ts         REAL    NOT NULL,
+    seq        INTEGER NOT NULL,
+    PRIMARY KEY (device, device_seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_reviews_seq ON reviews (seq);
+"""
+
+SQL_SERVER_SEQ = "SELECT MAX(seq) FROM (SELECT MAX(seq) AS seq FROM tasks UNION ALL SELECT MAX(seq) FROM reviews)"
+SQL_SERVER_TASK = "SELECT modified, device FROM tasks WHERE uid = ?"
+SQL_SERVER_PUT_TASK = ("INSERT OR REPLACE INTO tasks (uid, name, description, created, modified, device, "
+                       "next_review, seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_SERVER_PUT_REVIEW = ("INSERT OR IGNORE INTO reviews (device, device_seq, uid, grade, ts, seq) "
+                         "VALUES (?, ?, ?, ?, ?, ?)")
+SQL_SERVER_TASKS_AFTER = ("SELECT seq, uid, name, description, created, modified, device, next_review FROM tasks "
+                          "WHERE seq > ? AND device != ? ORDER BY seq LIMIT ?")
+SQL_SERVER_REVIEWS_AFTER = ("SELECT seq, device, device_seq, uid, grade, ts FROM reviews "
+                            "WHERE seq > ? AND device != ? ORDER BY seq LIMIT ?")
+
+
+class SyncServer:
+    """Reference hub keeping the latest version of every task and every review, in SQLite
+
+    Each stored change gets the next server sequence number; clients pull what other devices
+    changed after the last number they saw. Meant for local and offline testing: it binds to
+    localhost by default and has no authentication.
+    """
+
+    def __init__(self, path=':memory:', host='127.0.0.1', port=0, max_batch=BATCH_SIZE):
+        self.max_batch = max_batch
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SERVER_SCHEMA)
+        self._seq = self._conn.execute(SQL_SERVER_SEQ).fetchone()[0] or 0
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='sync-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._conn.close()
+
+    def handle(self, message):
+        """Store the pushed changes and return those of other devices after the client's cursor"""
+        if message.get('version') != PROTOCOL_VERSION:
+            raise ValueError(f"unsupported protocol version {message.get('version')!r}")
+        device = message['device']
+        limit = max(1, min(int(message.get('limit', self.max_batch)), self.max_batch))
+        # Other devices match tasks and reviews by uid; a record without one could never be merged
+        if any(task[0] is None for task in message['tasks']):
+            raise ValueError("task without a uid")
+        if any(review[2] is None for review in message['reviews']):
+            raise ValueError("review of a task without a uid")
+        with self._lock, self._conn:
+            for task in message['tasks']:
+                current = self._conn.execute(SQL_SERVER_TASK, (task[0],)).fetchone()
+                if current is None or (task[4], task[5]) > tuple(current):
+                    self._seq += 1
+                    self._conn.execute(SQL_SERVER_PUT_TASK, (*task, self._seq))
+            for review in message['reviews']:
+                if self._conn.execute(SQL_SERVER_PUT_REVIEW, (*review, self._seq + 1)).rowcount:
+                    self._seq += 1
+
+            cursor = message['cursor']
+            tasks = self._conn.execute(SQL_SERVER_TASKS_AFTER, (cursor, device, limit + 1)).fetchall()
+            reviews = self._conn.execute(SQL_SERVER_REVIEWS_AFTER, (cursor, device, limit + 1)).fetchall()
+            changes = sorted(tasks + reviews, key=lambda row: row[0])
+            more = len(changes) > limit
+            changes = changes[:limit]
+            return {
+                'version': PROTOCOL_VERSION,
+                'cursor': changes[-1][0] if more else self._seq,
+                'more': more,
+                'tasks': [list(row[1:]) for row in changes if len(row) == 8],
+                'reviews': [list(row[1:]) for row in changes if len(row) == 6]
+            }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/sync':
+                    self.send_error(404)
+                    return
+                try:
+                    message = decode(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    body = encode(server.handle(message))
+                except (ValueError, KeyError, TypeError, zlib.error) as error:
+                    self.send_error(400, str(error))
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reference sync server for Better Learning")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="run the hub on localhost")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--data', default='sync-hub.db', help="server database (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    server = SyncServer(args.data, args.host, args.port)
+    print(f'Serving sync on {server.url}/sync')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,113 +1,44 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from task_store import TaskStore
+from instrumentation import METRICS
+from theme import COLORS, setup_theme
 
 
 class Task:
     """Task class for adding new learning tasks"""
-    def __init__(self, main_root):
+
+    DUPLICATE_DELAY = 250
+
+    def __init__(self, main_root, store=None, duplicates=None):
         self.task_name = tk.StringVar()
         self.task_description = tk.StringVar()
         self.main_root = main_root
+        self.store = store or TaskStore()
+        self.duplicates = duplicates
+        self._duplicate_check = None
 
         self.root = tk.Toplevel(main_root)
         self.root.title("Adding new task")
-        self.root.geometry("900x500")
         self.root.resizable(False, False)
 
         self.root.transient(main_root)
-        self.root.grab_set()
+        self.root.protocol('WM_DELETE_WINDOW', self.close_window)
 
-        self.colors = {
-            'bg': '#0f172a',
-            'card': '#1e293b',
-            'primary': '#3b82f6',
-            'secondary': '#8b5cf6',
-            'text': '#f1f5f9',
-            'button_text': '#0f172a',
-            'text_secondary': '#94a3b8',
-            'border': '#334155',
-            'success': '#10b981',
-            'danger': '#ef4444',
-            'input_bg': '#2d3748',
-            'input_border': '#4a5568',
-            'input_focus': '#3b82f6'
-        }
+        self.colors = COLORS
 
         self.root.configure(bg=self.colors['bg'])
-        self.setup_styles()
-        self.center_window()
+        setup_theme(self.root)
+        self.center_window(900, 500)
         self.create_window_style()
 
         self.root.bind('<Return>', lambda e: self.add_to_tracking())
+        if self.duplicates is not None:
+            self.task_name.trace_add('write', lambda *args: self.schedule_duplicate_check())
+            self.desc_text.bind('<KeyRelease>', lambda e: self.schedule_duplicate_check(), add='+')
 
-    def setup_styles(self):
-        """Setup styles for minimalist design"""
-        style = ttk.Style()
-
-        # Style for window title
-        style.configure('WindowTitle.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text'],
-                        font=('Segoe UI', 24, 'bold'),
-                        padding=10)
-
-        # Style for section titles
-        style.configure('Section.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text'],
-                        font=('Segoe UI', 14, 'bold'),
-                        padding=5)
-
-        # Style for normal text
-        style.configure('Normal.TLabel',
-                        background=self.colors['card'],
-                        foreground=self.colors['text_secondary'],
-                        font=('Segoe UI', 11),
-                        padding=2)
-
-        # Style for cards/frames
-        style.configure('Card.TFrame',
-                        background=self.colors['card'],
-                        relief='flat',
-                        borderwidth=0)
-
-        # Style for primary buttons
-        style.configure('Primary.TButton',
-                        background=self.colors['primary'],
-                        foreground=self.colors['button_text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 12, 'bold'),
-                        padding=12)
-        style.map('Primary.TButton',
-                  background=[('active', '#2563eb')])
-
-        # Style for secondary buttons
-        style.configure('Secondary.TButton',
-                        background=self.colors['secondary'],
-                        foreground=self.colors['text'],
-                        borderwidth=0,
-                        font=('Segoe UI', 12, 'bold'),
-                        padding=12)
-        style.map('Secondary.TButton',
-                  background=[('active', '#7c3aed')])
-
-        # Style for text input
-        style.configure('Input.TEntry',
-                        fieldbackground=self.colors['input_bg'],
-                        foreground=self.colors['text'],
-                        borderwidth=1,
-                        relief='flat',
-                        padding=10,
-                        insertcolor=self.colors['text'])
-        style.map('Input.TEntry',
-                  fieldbackground=[('focus', '#374151')],
-                  bordercolor=[('focus', self.colors['primary'])])
-
-    def center_window(self):
-        """Center the window on screen"""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
+    def center_window(self, width, height):
+        """Size the window and center it on screen without forcing a layout pass"""
         x = (self.root.winfo_screenwidth() // 2) - (width // 2)
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
@@ -171,6 +102,9 @@ class Task:
         self.name_entry.bind('<FocusIn>', lambda e: self.clear_placeholder(self.name_entry, "Enter task name..."))
         self.name_entry.bind('<FocusOut>', lambda e: self.add_placeholder(self.name_entry, "Enter task name..."))
 
+        self.duplicate_label = ttk.Label(name_frame, text="", style='Warning.TLabel')
+        self.duplicate_label.pack(anchor='w')
+
         desc_frame = ttk.Frame(form_frame, style='Card.TFrame')
         desc_frame.pack(fill='both', expand=True, pady=(0, 20))
 
@@ -204,6 +138,26 @@ class Task:
         self.desc_text.bind('<FocusOut>',
                             lambda e: self.add_text_placeholder(self.desc_text, "Enter task description..."))
 
+    def show(self):
+        """Show the window and make it modal"""
+        self.root.deiconify()
+        self.root.grab_set()
+        self.name_entry.focus_set()
+
+    def hide(self):
+        """Hide the window so it can be reused"""
+        self.cancel_duplicate_check()
+        self.root.grab_release()
+        self.root.withdraw()
+
+    def reset(self):
+        """Clear the form for a new task"""
+        self.duplicate_label.configure(text="")
+        self.name_entry.delete(0, tk.END)
+        self.add_placeholder(self.name_entry, "Enter task name...")
+        self.desc_text.delete('1.0', tk.END)
+        self.add_text_placeholder(self.desc_text, "Enter task description...")
+
     def clear_placeholder(self, entry, placeholder):
         """Clear placeholder text on focus"""
         if entry.get() == placeholder:
@@ -228,12 +182,58 @@ class Task:
             text_widget.insert('1.0', placeholder)
             text_widget.configure(fg=self.colors['text_secondary'])
 
+    def schedule_duplicate_check(self):
+        """Look for similar tasks once typing pauses"""
+        self.cancel_duplicate_check()
+        self._duplicate_check = self.root.after(self.DUPLICATE_DELAY, self.check_duplicates)
+
+    def cancel_duplicate_check(self):
+        """Drop a pending duplicate check"""
+        if self._duplicate_check is not None:
+            self.root.after_cancel(self._duplicate_check)
+            self._duplicate_check = None
+
+    def check_duplicates(self):
+        """Warn when the typed task nearly matches one that already exists"""
+        self._duplicate_check = None
+        name = self.task_name.get().strip()
+        if not name or name == "Enter task name...":
+            self.duplicate_label.configure(text="")
+            return
+        description = self.desc_text.get('1.0', 'end-1c').strip()
+        if description == "Enter task description...":
+            description = ''
+
+        with METRICS.timer('task.duplicate_check'):
+            matches = self.duplicates.similar(name, description)
+        if not matches:
+            self.duplicate_label.configure(text="")
+            return
+        similarity, task_id = matches[0]
+        rows = self.store.get_many([task_id])
+        if not rows:
+            self.duplicate_label.configure(text="")
+            return
+        text = f"Similar to existing task '{rows[0][1]}' ({similarity:.0%} match)"
+        if len(matches) > 1:
+            text += f" and {len(matches) - 1} more"
+        self.duplicate_label.configure(text=text)
+
     def add_to_tracking(self):
         """Add task to tracking system"""
+        name = self.task_name.get().strip()
+        if not name or name == "Enter task name...":
+            messagebox.showwarning("Missing name", "Please enter a task name.", parent=self.root)
+            return
+
+        description = self.desc_text.get('1.0', 'end-1c').strip()
+        if description == "Enter task description...":
+            description = ''
 
-        messagebox.showinfo("Success", f"Task '{1}' added to tracking!")
+        self.store.add_task(name, description)
+        messagebox.showinfo("Success", f"Task '{name}' added to tracking!")
         self.close_window()
 
     def close_window(self):
         """Close the task window"""
-        self.root.destroy()
+        self.hide()
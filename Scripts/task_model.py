@@ -0,0 +1,192 @@
+import bisect
+import string
+import threading
+from array import array
+import numpy as np
+from task_store import NO_FILTER
+
+# SQLite's NOCASE collation folds ASCII letters only; name sorting here must match it
+NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class TaskRecord:
+    """One task; the description is read from the store the first time it is needed"""
+
+    __slots__ = ('id', 'name', 'created', 'next_review', 'repeated', '_description', '_store')
+
+    def __init__(self, store, task_id, name, created, next_review, repeated, description=None):
+        self._store = store
+        self.id = task_id
+        self.name = name
+        self.created = created
+        self.next_review = next_review
+        self.repeated = repeated
+        self._description = description
+
+    @classmethod
+    def from_summary(cls, store, row):
+        """Build a record from an (id, name, created, next_review, repeated) row"""
+        return cls(store, *row)
+
+    @property
+    def description(self):
+        """Full description text, loaded lazily"""
+        if self._description is None:
+            self._description = self._store.get_description(self.id)
+        return self._description
+
+    def preview(self, length=120):
+        """First line of the description, shortened for table cells"""
+        line = self.description.split('\n', 1)[0]
+        return line if len(line) <= length else line[:length - 1] + '…'
+
+
+class TaskTable:
+    """Scheduling fields and names of every task kept in parallel arrays, sorted by id
+
+    Descriptions stay in the store. Search hits are filtered and sorted here (filter_ids), so a
+    keystroke only reads the rows on screen from SQLite.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.created = array('d')
+        self.next_review = array('d')
+        self.repeated = array('q')
+        self.names = []
+        self.loaded = False
+        self._name_ranks = None
+        self._lock = threading.Lock()
+        self._changes_during_load = None
+
+    @classmethod
+    def from_store(cls, store):
+        """Load the scheduling fields of every task"""
+        table = cls()
+        table.load(store)
+        return table
+
+    def load(self, store, chunk_size=20000):
+        """Replace the contents with the tasks of the store"""
+        with self._lock:
+            self._changes_during_load = []
+        ids, created, next_review, repeated, names = array('q'), array('d'), array('d'), array('q'), []
+        cursor = store.schedule_summary()
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for column, values in zip((ids, created, next_review, repeated, names), zip(*rows)):
+                column.extend(values)
+        with self._lock:
+            self.ids, self.created, self.next_review, self.repeated = ids, created, next_review, repeated
+            self.names = names
+            self._name_ranks = None
+            self.loaded = True
+            changes, self._changes_during_load = self._changes_during_load, None
+        for change in changes:
+            self.upsert(*change)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def snapshot(self):
+        """Return copies of the (ids, created, next_review, repeated) arrays taken at one moment"""
+        with self._lock:
+            return array('q', self.ids), array('d', self.created), array('d', self.next_review), array('q', self.repeated)
+
+    def index(self, task_id):
+        """Return the array position of a task, or -1"""
+        position = bisect.bisect_left(self.ids, task_id)
+        if position < len(self.ids) and self.ids[position] == task_id:
+            return position
+        return -1
+
+    def upsert(self, task_id, created, next_review, repeated, name):
+        """Insert or update the fields of one task"""
+        with self._lock:
+            if self._changes_during_load is not None:
+                self._changes_during_load.append((task_id, created, next_review, repeated, name))
+            position = bisect.bisect_left(self.ids, task_id)
+            if position < len(self.ids) and self.ids[position] == task_id:
+                self.created[position] = created
+                self.next_review[position] = next_review
+                self.repeated[position] = repeated
+                if self.names[position] != name:
+                    self.names[position] = name
+                    self._name_ranks = None
+            else:
+                self.ids.insert(position, task_id)
+                self.created.insert(position, created)
+                self.next_review.insert(position, next_review)
+                self.repeated.insert(position, repeated)
+                self.names.insert(position, name)
+                self._name_ranks = None
+
+    def filter_ids(self, task_ids, sort='id', descending=False, task_filter=NO_FILTER):
+        """Sort and filter a set of task ids (e.g. search results) like TaskStore.filter_ids, in memory
+
+        Ids the table does not hold are left out. Returns an array('q') of ids: slicing it for the
+        rows on screen is cheap, while building int objects for every hit would not be.
+        """
+        hits = np.fromiter(task_ids, dtype=np.int64, count=len(task_ids))
+        hits.sort()
+        with self._lock:
+            ordered = self._filter_positions(hits, sort, task_filter)
+        return array('q', (ordered[::-1] if descending else ordered).tobytes())
+
+    def _filter_positions(self, hits, sort, task_filter):
+        """Ids of the sorted hits that pass the filter, in ascending sort order; called under the lock
+
+        The NumPy views share the arrays' memory, which cannot be resized while a view exists, so
+        they all go out of scope before the lock is released.
+        """
+        ids = np.frombuffer(self.ids, dtype=np.int64)
+        if len(ids) and ids[-1] - ids[0] + 1 == len(ids):
+            # No gaps between the ids: a task's position is its distance from the first id
+            positions = hits - ids[0]
+            positions = positions[(positions >= 0) & (positions < len(ids))]
+        else:
+            positions = np.searchsorted(ids, hits)
+            inside = positions < len(ids)
+            positions = positions[inside]
+            positions = positions[ids[positions] == hits[inside]]
+
+        keep = np.ones(len(positions), dtype=bool)
+        if task_filter.due_from is not None or task_filter.due_before is not None:
+            next_review = np.frombuffer(self.next_review, dtype=np.float64)[positions]
+            if task_filter.due_from is not None:
+                keep &= next_review >= task_filter.due_from
+            if task_filter.due_before is not None:
+                keep &= next_review < task_filter.due_before
+        if task_filter.repeated_min is not None or task_filter.repeated_max is not None:
+            repeated = np.frombuffer(self.repeated, dtype=np.int64)[positions]
+            if task_filter.repeated_min is not None:
+                keep &= repeated >= task_filter.repeated_min
+            if task_filter.repeated_max is not None:
+                keep &= repeated <= task_filter.repeated_max
+        # Positions grow with the sorted hits, so stable sorts break ties by id as the store does
+        positions = positions[keep]
+
+        if sort == 'name':
+            positions = positions[np.argsort(self._ranks_by_name()[positions], kind='stable')]
+        elif sort != 'id':
+            column = {'created': self.created, 'next_review': self.next_review, 'repeated': self.repeated}[sort]
+            values = np.frombuffer(column, dtype=np.int64 if column.typecode == 'q' else np.float64)
+            positions = positions[np.argsort(values[positions], kind='stable')]
+        return ids[positions]
+
+    def _ranks_by_name(self):
+        """Position of every task in NOCASE name order (ties by id), computed once per change"""
+        if self._name_ranks is None:
+            folded = [name.translate(NOCASE) for name in self.names]
+            order = sorted(range(len(folded)), key=folded.__getitem__)
+            self._name_ranks = np.empty(len(order), dtype=np.int64)
+            self._name_ranks[order] = np.arange(len(order))
+        return self._name_ranks
+
+    def on_store_change(self, event, rows):
+        """Store subscriber for added and changed tasks (store rows in COLUMNS order)"""
+        if event in ('add', 'update'):
+            for task_id, name, description, created, next_review, repeated in rows:
+                self.upsert(task_id, created, next_review, repeated, name)
@@ -0,0 +1,728 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from instrumentation import METRICS
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.better_learning', 'tasks.db')
+
+DAY = 86400
+FIRST_INTERVAL = 1
+INITIAL_EASE = 2.5
+
+# Columns returned by every row query, in order
+COLUMNS = ('id', 'name', 'description', 'created', 'next_review', 'repeated')
+
+
+def day_start(timestamp):
+    """Return the local midnight that starts the day containing timestamp"""
+    moment = time.localtime(timestamp)
+    return time.mktime((moment.tm_year, moment.tm_mon, moment.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def name_hash(name):
+    """Return a signed 64-bit hash of a task name, ignoring case and spacing"""
+    key = ' '.join(name.casefold().split()).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big', signed=True)
+
+
+def add_name_hash(conn):
+    """Migration: index task names by hash for duplicate detection"""
+    conn.execute('ALTER TABLE tasks ADD COLUMN name_hash INTEGER')
+    rows = conn.execute('SELECT id, name FROM tasks').fetchall()
+    conn.executemany('UPDATE tasks SET name_hash = ? WHERE id = ?',
+                     ((name_hash(name), task_id) for task_id, name in rows))
+    conn.execute('CREATE INDEX idx_tasks_name_hash ON tasks (name_hash)')
+
+
+# Sortable columns: key -> SQL expression (every one is backed by an index)
+SORT_COLUMNS = {
+    'id': 'id',
+    'name': 'name COLLATE NOCASE',
+    'created': 'created',
+    'next_review': 'next_review',
+    'repeated': 'repeated'
+}
+
+# Position of each sortable column inside a summary row
+SUMMARY_POSITIONS = {'id': 0, 'name': 1, 'created': 2, 'next_review': 3, 'repeated': 4}
+
+SUMMARY_SELECT = "SELECT id, name, created, next_review, repeated FROM tasks"
+
+
+class TaskFilter:
+    """Range conditions on the next review time and repetition count"""
+
+    def __init__(self, due_from=None, due_before=None, repeated_min=None, repeated_max=None):
+        self.due_from = due_from
+        self.due_before = due_before
+        self.repeated_min = repeated_min
+        self.repeated_max = repeated_max
+
+    def conditions(self, sort=None):
+        """Return SQL conditions and their parameters
+
+        When a sort column is given, conditions on other columns are written so SQLite walks
+        the index of the sort column instead of sorting every matching row for each page.
+        """
+        conditions, params = [], []
+        for value, column, operator in ((self.due_from, 'next_review', '>='),
+                                        (self.due_before, 'next_review', '<'),
+                                        (self.repeated_min, 'repeated', '>='),
+                                        (self.repeated_max, 'repeated', '<=')):
+            if value is not None:
+                prefix = '+' if sort is not None and sort != column else ''
+                conditions.append(f'{prefix}{column} {operator} ?')
+                params.append(value)
+        return conditions, params
+
+
+NO_FILTER = TaskFilter()
+
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS = [
+    """
+    CREATE TABLE tasks (
+        id          INTEGER PRIMARY KEY,
+        name        TEXT    NOT NULL,
+        description TEXT    NOT NULL DEFAULT '',
+        created     REAL    NOT NULL,
+        next_review REAL    NOT NULL,
+        repeated    INTEGER NOT NULL DEFAULT 0,
+        interval    REAL    NOT NULL DEFAULT 0,
+        ease        REAL    NOT NULL DEFAULT 2.5,
+        last_review REAL
+    );
+    CREATE INDEX idx_tasks_next_review ON tasks (next_review);
+    CREATE INDEX idx_tasks_created ON tasks (created);
+    """,
+    """
+    CREATE TABLE review_log (
+        seq     INTEGER PRIMARY KEY,
+        task_id INTEGER NOT NULL,
+        kind    TEXT    NOT NULL,
+        grade   INTEGER,
+        ts      REAL    NOT NULL
+    );
+    CREATE INDEX idx_review_log_task ON review_log (task_id);
+    CREATE TABLE meta (
+        key   TEXT PRIMARY KEY,
+        value
+    );
+    """,
+    add_name_hash,
+    """
+    CREATE INDEX idx_tasks_repeated ON tasks (repeated);
+    CREATE INDEX idx_tasks_name ON tasks (name COLLATE NOCASE);
+    """,
+    # Sync: tasks get a device-independent uid and a last-writer-wins stamp. New local tasks are
+    # found by id above the 'sync_task_id' watermark, edited ones are queued by a trigger; reviews
+    # from other devices live in remote_log
+    """
+    ALTER TABLE tasks ADD COLUMN uid TEXT;
+    ALTER TABLE tasks ADD COLUMN modified REAL;
+    ALTER TABLE tasks ADD COLUMN origin TEXT;
+    CREATE UNIQUE INDEX idx_tasks_uid ON tasks (uid) WHERE uid IS NOT NULL;
+    CREATE TABLE sync_pending (
+        task_id INTEGER PRIMARY KEY
+    );
+    CREATE TABLE remote_log (
+        device   TEXT    NOT NULL,
+        seq      INTEGER NOT NULL,
+        task_uid TEXT    NOT NULL,
+        grade    INTEGER NOT NULL,
+        ts       REAL    NOT NULL,
+        PRIMARY KEY (device, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_remote_log_task ON remote_log (task_uid);
+    CREATE TRIGGER tasks_sync_edit AFTER UPDATE OF name, description ON tasks
+    BEGIN
+        INSERT OR IGNORE INTO sync_pending (task_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER tasks_sync_stamp AFTER UPDATE OF name, description ON tasks
+    WHEN new.modified IS old.modified
+    BEGIN
+        UPDATE tasks SET modified = (julianday('now') - 2440587.5) * 86400.0, origin = NULL WHERE id = new.id;
+    END;
+    """,
+]
+
+
+def split_statements(script):
+    """Split an SQL script into single statements; trigger bodies stay whole"""
+    statements, current = [], ''
+    for part in script.split(';'):
+        current += part + ';'
+        if sqlite3.complete_statement(current):
+            if current.strip(' \n;'):
+                statements.append(current.strip())
+            current = ''
+    return statements
+
+
+SQL_INSERT = ("INSERT INTO tasks (name, description, created, next_review, name_hash) "
+              "VALUES (?, ?, ?, ?, ?)")
+SQL_GET = "SELECT id, name, description, created, next_review, repeated FROM tasks WHERE id = ?"
+SQL_DUE = ("SELECT id, name, description, created, next_review, repeated FROM tasks "
+           "WHERE next_review <= ? ORDER BY next_review LIMIT ?")
+SQL_COUNT_DUE = "SELECT COUNT(*) FROM tasks WHERE next_review <= ?"
+SQL_COUNT = "SELECT COUNT(*) FROM tasks"
+SQL_ALL = "SELECT id, name, description, created, next_review, repeated FROM tasks ORDER BY id"
+SQL_SCHEDULE = "SELECT id, next_review FROM tasks"
+SQL_SCHEDULE_STATE = "SELECT id, ease, interval, repeated, next_review FROM tasks"
+SQL_UPDATE_SCHEDULE = "UPDATE tasks SET interval = ?, next_review = ? WHERE id = ?"
+SQL_REVIEW_STATE = "SELECT ease, interval, repeated FROM tasks WHERE id = ?"
+SQL_APPLY_REVIEW = ("UPDATE tasks SET ease = ?, interval = ?, repeated = ?, last_review = ?, next_review = ? "
+                    "WHERE id = ?")
+SQL_LOG_EVENT = "INSERT OR IGNORE INTO review_log (seq, task_id, kind, grade, ts) VALUES (?, ?, ?, ?, ?)"
+SQL_GET_META = "SELECT value FROM meta WHERE key = ?"
+SQL_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+SQL_EXPORT_TASKS = ("SELECT id, name, description, created, next_review, repeated, interval, ease, last_review, "
+                    "uid, modified, origin FROM tasks ORDER BY id")
+SQL_HISTORY = "SELECT seq, task_id, kind, grade, ts FROM review_log ORDER BY seq"
+SQL_REVIEW_GRADES = ("SELECT ts, grade, seq FROM review_log WHERE kind = 'review' "
+                     "UNION ALL SELECT ts, grade, NULL FROM remote_log")
+# Rows without a uid (snapshots written before sync) keep the sync columns of the task they
+# replace. REPLACE rather than an upsert: an UPDATE would fire the sync triggers and stamp every
+# restored task as a fresh local edit
+SQL_RESTORE_TASK = ("INSERT OR REPLACE INTO tasks (id, name, description, created, next_review, repeated, interval, "
+                    "ease, last_review, uid, modified, origin, name_hash) "
+                    "SELECT r.id, r.name, r.description, r.created, r.next_review, r.repeated, r.interval, r.ease, "
+                    "r.last_review, COALESCE(r.uid, t.uid), "
+                    "CASE WHEN r.uid IS NULL THEN t.modified ELSE r.modified END, "
+                    "CASE WHEN r.uid IS NULL THEN t.origin ELSE r.origin END, r.name_hash "
+                    "FROM (SELECT ? AS id, ? AS name, ? AS description, ? AS created, ? AS next_review, "
+                    "? AS repeated, ? AS interval, ? AS ease, ? AS last_review, ? AS uid, ? AS modified, "
+                    "? AS origin, ? AS name_hash) r LEFT JOIN tasks t ON t.id = r.id")
+SQL_QUEUE_UNSYNCED = "INSERT OR IGNORE INTO sync_pending (task_id) SELECT id FROM tasks WHERE id <= ? AND uid IS NULL"
+SQL_ASSIGN_UIDS = "UPDATE tasks SET uid = lower(hex(randomblob(16))) WHERE id > ? AND uid IS NULL"
+SQL_SYNC_COLUMNS = ("SELECT id, uid, name, description, created, COALESCE(modified, created), origin, next_review "
+                    "FROM tasks")
+SQL_NEW_TASKS = f"{SQL_SYNC_COLUMNS} WHERE id > ? AND origin IS NULL ORDER BY id LIMIT ?"
+SQL_EDITED_TASKS = f"{SQL_SYNC_COLUMNS} WHERE id IN (SELECT task_id FROM sync_pending ORDER BY task_id LIMIT ?)"
+SQL_LOCAL_REVIEWS = ("SELECT r.seq, t.uid, r.grade, r.ts FROM review_log r JOIN tasks t ON t.id = r.task_id "
+                     "WHERE r.kind = 'review' AND r.seq > ? ORDER BY r.seq LIMIT ?")
+SQL_SYNC_STATE = "SELECT id, COALESCE(modified, created), origin FROM tasks WHERE uid = ?"
+SQL_INSERT_REMOTE = ("INSERT INTO tasks (name, description, created, next_review, name_hash, uid, modified, origin) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_EDIT_REMOTE = "UPDATE tasks SET name = ?, description = ?, name_hash = ?, modified = ?, origin = ? WHERE id = ?"
+SQL_DROP_PENDING = "DELETE FROM sync_pending WHERE task_id = ?"
+SQL_LOG_REMOTE = "INSERT OR IGNORE INTO remote_log (device, seq, task_uid, grade, ts) VALUES (?, ?, ?, ?, ?)"
+SQL_TASK_BY_UID = "SELECT id FROM tasks WHERE uid = ?"
+SQL_HAS_REMOTE = "SELECT 1 FROM remote_log WHERE task_uid = ? LIMIT 1"
+SQL_TASK_REVIEWS = "SELECT ts, seq, grade FROM review_log WHERE task_id = ? AND kind = 'review'"
+SQL_REMOTE_REVIEWS = "SELECT ts, device, seq, grade FROM remote_log WHERE task_uid = ?"
+SQL_SCHEDULE_SUMMARY = "SELECT id, created, next_review, repeated, name FROM tasks ORDER BY id"
+SQL_DESCRIPTION = "SELECT description FROM tasks WHERE id = ?"
+
+
+class KeysetPager:
+    """Fetches fixed-size pages of a sorted, filtered query, using keyset ranges where it can
+
+    The first and last key of every fetched page are remembered, so scrolling to a
+    neighbouring page is an index range scan; only jumps fall back to OFFSET.
+    """
+
+    def __init__(self, store, sort='id', descending=False, task_filter=NO_FILTER):
+        self.store = store
+        self.sort = sort
+        self.descending = descending
+        self.task_filter = task_filter
+        self._first_keys = {}
+        self._last_keys = {}
+
+    def count(self):
+        """Count the rows of the query"""
+        return self.store.count_filtered(self.task_filter)
+
+    def page(self, offset, limit):
+        """Return the summary rows of the page starting at offset (a multiple of limit)"""
+        block = offset // limit
+        query = dict(sort=self.sort, descending=self.descending, task_filter=self.task_filter, limit=limit)
+        if block > 0 and block - 1 in self._last_keys:
+            rows = self.store.query_page(after=self._last_keys[block - 1], **query)
+        elif block + 1 in self._first_keys:
+            rows = self.store.query_page(before=self._first_keys[block + 1], **query)
+        else:
+            rows = self.store.query_page(offset=offset, **query)
+
+        if rows:
+            position = SUMMARY_POSITIONS[self.sort]
+            self._first_keys[block] = (rows[0][position], rows[0][0])
+            self._last_keys[block] = (rows[-1][position], rows[-1][0])
+        return rows
+
+
+class TaskStore:
+    """SQLite storage for learning tasks"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._listeners = []
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.migrate(self.connection())
+
+    def connection(self):
+        """Return the connection owned by the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def subscribe(self, callback):
+        """Call callback(event, rows) after tasks are added or changed
+
+        Events: 'add' and 'update' pass task rows in COLUMNS order, 'review' passes the applied
+        (seq, task_id, kind, grade, ts) review log rows, 'reload' and 'import' pass no rows.
+        """
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop calling a subscribed callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify(self, event, rows):
+        """Pass a change to every subscriber"""
+        for callback in list(self._listeners):
+            callback(event, rows)
+
+    def migrate(self, conn):
+        """Bring the database schema up to date
+
+        Every step runs in one transaction together with its user_version bump, so a failed or
+        interrupted step leaves the schema at the previous version instead of half applied.
+        """
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have applied the step while this one waited for the lock
+                if conn.execute('PRAGMA user_version').fetchone()[0] < number:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        for statement in split_statements(step):
+                            conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version = {number}')
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @METRICS.timed('store.add_task')
+    def add_task(self, name, description='', now=None):
+        """Insert a new task and return its id"""
+        now = time.time() if now is None else now
+        next_review = now + FIRST_INTERVAL * DAY
+        conn = self.connection()
+        with conn:
+            cursor = conn.execute(SQL_INSERT, (name, description, now, next_review, name_hash(name)))
+        task_id = cursor.lastrowid
+        self.notify('add', [(task_id, name, description, now, next_review, 0)])
+        return task_id
+
+    def set_cache_size(self, kib=None):
+        """Resize the page cache of the calling thread's connection (None restores the default)"""
+        size = -kib if kib else -2000
+        self.connection().execute(f'PRAGMA cache_size = {size}')
+
+    @METRICS.timed('store.insert_many')
+    def insert_many(self, rows):
+        """Insert (name, description, created, next_review, name_hash) rows in one transaction
+
+        Subscribers are not notified per row; callers announce bulk changes themselves.
+        """
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany(SQL_INSERT, rows)
+        return cursor.rowcount
+
+    @METRICS.timed('store.existing_name_hashes')
+    def existing_name_hashes(self, hashes, chunk_size=500):
+        """Return the subset of name hashes that already belong to stored tasks"""
+        hashes = list(hashes)
+        found = set()
+        conn = self.connection()
+        for start in range(0, len(hashes), chunk_size):
+            chunk = hashes[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT name_hash FROM tasks WHERE name_hash IN ({placeholders})", chunk))
+        return found
+
+    def get_task(self, task_id):
+        """Return a single task row or None"""
+        return self.connection().execute(SQL_GET, (task_id,)).fetchone()
+
+    @METRICS.timed('store.get_many')
+    def get_many(self, task_ids):
+        """Return rows for the given ids, in the same order"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        placeholders = ','.join('?' * len(task_ids))
+        rows = self.connection().execute(
+            f"SELECT id, name, description, created, next_review, repeated FROM tasks WHERE id IN ({placeholders})",
+            task_ids
+        ).fetchall()
+        by_id = {row[0]: row for row in rows}
+        return [by_id[task_id] for task_id in task_ids if task_id in by_id]
+
+    @METRICS.timed('store.get_summaries')
+    def get_summaries(self, task_ids):
+        """Return (id, name, created, next_review, repeated) rows for the given ids, in order"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        placeholders = ','.join('?' * len(task_ids))
+        rows = self.connection().execute(
+            f"SELECT id, name, created, next_review, repeated FROM tasks WHERE id IN ({placeholders})",
+            task_ids
+        ).fetchall()
+        by_id = {row[0]: row for row in rows}
+        return [by_id[task_id] for task_id in task_ids if task_id in by_id]
+
+    @METRICS.timed('store.get_description')
+    def get_description(self, task_id):
+        """Return the description of one task ('' if it does not exist)"""
+        row = self.connection().execute(SQL_DESCRIPTION, (task_id,)).fetchone()
+        return row[0] if row else ''
+
+    @METRICS.timed('store.due_tasks')
+    def due_tasks(self, now=None, limit=100):
+        """Return tasks whose next review is due, oldest first"""
+        now = time.time() if now is None else now
+        return self.connection().execute(SQL_DUE, (now, limit)).fetchall()
+
+    @METRICS.timed('store.count_due')
+    def count_due(self, now=None):
+        """Count tasks whose next review is due"""
+        now = time.time() if now is None else now
+        return self.connection().execute(SQL_COUNT_DUE, (now,)).fetchone()[0]
+
+    def count(self):
+        """Count all tasks"""
+        return self.connection().execute(SQL_COUNT).fetchone()[0]
+
+    def all_tasks(self):
+        """Iterate over all tasks ordered by id"""
+        return self.connection().execute(SQL_ALL)
+
+    def schedule(self):
+        """Return (task_id, next_review) pairs for every task"""
+        return self.connection().execute(SQL_SCHEDULE).fetchall()
+
+    def schedule_state(self):
+        """Iterate over (id, ease, interval, repeated, next_review) for every task"""
+        return self.connection().execute(SQL_SCHEDULE_STATE)
+
+    def update_schedules(self, rows):
+        """Write many (interval, next_review, id) rows in one transaction"""
+        conn = self.connection()
+        with conn:
+            conn.executemany(SQL_UPDATE_SCHEDULE, rows)
+        self.notify('reload', [])
+
+    def export_tasks(self):
+        """Iterate lazily over every task with all scheduling and sync columns"""
+        return self.connection().execute(SQL_EXPORT_TASKS)
+
+    def review_grades(self):
+        """Iterate lazily over (ts, grade, seq) of every review; seq is None for reviews from other devices"""
+        return self.connection().execute(SQL_REVIEW_GRADES)
+
+    def review_history(self):
+        """Iterate lazily over the review log in sequence order"""
+        return self.connection().execute(SQL_HISTORY)
+
+    def restore(self, tasks, history, batch_size=10000):
+        """Write full task rows and review log rows, e.g. from a snapshot, in one transaction
+
+        Task rows are in export_tasks() order, uid, modified and origin included. A row whose uid
+        is None keeps the sync columns of the task it replaces; new tasks without one get a uid
+        and are queued for the next sync like edited ones.
+
+        The journal sequence moves past the restored log rows in the same transaction, so events
+        journaled afterwards do not reuse their sequence numbers and get dropped as duplicates.
+        """
+        tasks = iter(tasks)
+        history = iter(history)
+        conn = self.connection()
+        self.set_cache_size(65536)
+        try:
+            with conn:
+                for batch in iter(lambda: list(itertools.islice(tasks, batch_size)), []):
+                    conn.executemany(SQL_RESTORE_TASK, [row + (name_hash(row[1]),) for row in batch])
+                # Tasks at or below the watermark are not sent as new ones, so they are queued
+                conn.execute(SQL_QUEUE_UNSYNCED, (self.meta('sync_task_id', 0),))
+                conn.execute(SQL_ASSIGN_UIDS, (0,))
+                last_seq = self.journal_seq()
+                for batch in iter(lambda: list(itertools.islice(history, batch_size)), []):
+                    conn.executemany(SQL_LOG_EVENT, batch)
+                    last_seq = max(last_seq, max(row[0] for row in batch))
+                conn.execute(SQL_SET_META, ('journal_seq', last_seq))
+        finally:
+            self.set_cache_size()
+        self.notify('import', [])
+
+    def journal_seq(self):
+        """Return the sequence number of the last journal event folded into the store"""
+        row = self.connection().execute(SQL_GET_META, ('journal_seq',)).fetchone()
+        return row[0] if row else 0
+
+    @METRICS.timed('store.apply_events')
+    def apply_events(self, events, review):
+        """Fold journal events into the tasks and review log in one transaction
+
+        review(ease, interval, repeated, grade) must return the new (ease, interval, repeated).
+        Returns the number of events applied.
+        """
+        conn = self.connection()
+        changed = []
+        reviews = []
+        last_seq = None
+        with conn:
+            for seq, kind, task_id, grade, ts in events:
+                if kind == 'review':
+                    state = conn.execute(SQL_REVIEW_STATE, (task_id,)).fetchone()
+                    if state is None:
+                        continue
+                    ease, interval, repeated = review(state[0], state[1], state[2], grade)
+                    conn.execute(SQL_APPLY_REVIEW, (ease, interval, repeated, ts, ts + interval * DAY, task_id))
+                    changed.append(task_id)
+                    reviews.append((seq, task_id, kind, grade, ts))
+                conn.execute(SQL_LOG_EVENT, (seq, task_id, kind, grade, ts))
+                last_seq = seq
+            if last_seq is not None:
+                conn.execute(SQL_SET_META, ('journal_seq', last_seq))
+
+        if changed:
+            self.notify('review', reviews)
+            self.notify('update', self.get_many(dict.fromkeys(changed)))
+        return 0 if last_seq is None else len(changed)
+
+    def meta(self, key, default=None):
+        """Return a value from the meta table"""
+        row = self.connection().execute(SQL_GET_META, (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """Store a value in the meta table, replacing any previous one"""
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_SET_META, (key, value))
+
+    def device_id(self):
+        """Return the id this database syncs under, creating it on first use"""
+        device = self.meta('device_id')
+        if device is None:
+            device = uuid.uuid4().hex
+            self.set_meta('device_id', device)
+        return device
+
+    def pending_tasks(self, limit):
+        """Return up to limit (new tasks, edited tasks) that have not been synced yet
+
+        Rows are (id, uid, name, description, created, modified, origin, next_review); new tasks
+        get their uid here.
+        """
+        after = self.meta('sync_task_id', 0)
+        conn = self.connection()
+        with conn:
+            conn.execute(SQL_ASSIGN_UIDS, (after,))
+        new = conn.execute(SQL_NEW_TASKS, (after, limit)).fetchall()
+        edited = conn.execute(SQL_EDITED_TASKS, (limit - len(new),)).fetchall() if len(new) < limit else []
+        sent = {row[0] for row in new}
+        return new, [row for row in edited if row[0] not in sent]
+
+    def local_reviews(self, after_seq, limit):
+        """Return up to limit (seq, task uid, grade, ts) reviews logged on this device after after_seq"""
+        return self.connection().execute(SQL_LOCAL_REVIEWS, (after_seq, limit)).fetchall()
+
+    def mark_synced(self, new, edited, review_seq):
+        """Record that tasks from pending_tasks and reviews up to review_seq reached the server"""
+        conn = self.connection()
+        with conn:
+            if new:
+                conn.execute(SQL_SET_META, ('sync_task_id', new[-1][0]))
+            conn.executemany(SQL_DROP_PENDING, ((row[0],) for row in new + edited))
+            conn.execute(SQL_SET_META, ('sync_review_seq', review_seq))
+
+    @METRICS.timed('store.apply_remote')
+    def apply_remote(self, tasks, reviews, review, replay=(), bulk=1000):
+        """Merge tasks and reviews received from other devices in one transaction
+
+        tasks are (uid, name, description, created, modified, device, next_review) rows: unknown
+        uids are added, known ones take the incoming text when (modified, device) is newer. reviews are
+        (device, seq, uid, grade, ts) rows. Every task with reviews from other devices is
+        rescheduled by replaying all its reviews in (ts, device, seq) order, so devices that saw
+        the same reviews agree on the schedule whatever order they arrived in; replay names
+        further uids to reschedule, e.g. those whose local reviews were just sent.
+        review(ease, interval, repeated, grade) must return the new (ease, interval, repeated).
+        Returns (tasks added or changed, reviews stored).
+        """
+        device = self.device_id()
+        conn = self.connection()
+        added, edited, remote_reviews = [], [], []
+        logged = 0
+        touched = dict.fromkeys(replay)
+        with conn:
+            for uid, name, description, created, modified, origin, next_review in tasks:
+                current = conn.execute(SQL_SYNC_STATE, (uid,)).fetchone()
+                if current is None:
+                    task_id = conn.execute(SQL_INSERT_REMOTE, (
+                        name, description, created, next_review, name_hash(name), uid, modified, origin
+                    )).lastrowid
+                    added.append(task_id)
+                elif (modified, origin) > (current[1], current[2] or device):
+                    task_id = current[0]
+                    conn.execute(SQL_EDIT_REMOTE, (name, description, name_hash(name), modified, origin, task_id))
+                    edited.append(task_id)
+                else:
+                    continue
+                # An edit applied here was queued for sending back; this device did not make it
+                conn.execute(SQL_DROP_PENDING, (task_id,))
+                touched[uid] = None
+
+            for row in reviews:
+                if not conn.execute(SQL_LOG_REMOTE, row).rowcount:
+                    continue
+                logged += 1
+                uid, grade, ts = row[2:]
+                touched[uid] = None
+                found = conn.execute(SQL_TASK_BY_UID, (uid,)).fetchone()
+                if found is not None:
+                    remote_reviews.append((None, found[0], 'review', grade, ts))
+
+            for uid in touched:
+                found = conn.execute(SQL_TASK_BY_UID, (uid,)).fetchone()
+                if found is not None and conn.execute(SQL_HAS_REMOTE, (uid,)).fetchone() is not None:
+                    self._replay_reviews(conn, found[0], uid, device, review)
+                    edited.append(found[0])
+
+        new = set(added)
+        updated = [task_id for task_id in dict.fromkeys(edited) if task_id not in new]
+        if len(added) + len(updated) > bulk:
+            self.notify('import', [])
+        else:
+            if added:
+                self.notify('add', self.get_many(added))
+            if remote_reviews:
+                self.notify('review', remote_reviews)
+            if updated:
+                self.notify('update', self.get_many(updated))
+        return len(added) + len(updated), logged
+
+    @staticmethod
+    def _replay_reviews(conn, task_id, uid, device, review):
+        """Recompute a task's schedule from every review logged for it on any device"""
+        events = [(ts, device, seq, grade) for ts, seq, grade in conn.execute(SQL_TASK_REVIEWS, (task_id,))]
+        events.extend(conn.execute(SQL_REMOTE_REVIEWS, (uid,)))
+        events.sort()
+        ease, interval, repeated = INITIAL_EASE, 0.0, 0
+        for ts, _, _, grade in events:
+            ease, interval, repeated = review(ease, interval, repeated, grade)
+        last = events[-1][0]
+        conn.execute(SQL_APPLY_REVIEW, (ease, interval, repeated, last, last + interval * DAY, task_id))
+
+    @METRICS.timed('store.query_page')
+    def query_page(self, sort='id', descending=False, task_filter=NO_FILTER, limit=200,
+                   after=None, before=None, offset=0):
+        """Return summary rows of a sorted, filtered query
+
+        after/before are (sort value, id) keys of a neighbouring row; they turn the query into a
+        keyset range scan. Without them the page is located with OFFSET.
+        """
+        expression = SORT_COLUMNS[sort]
+        conditions, params = task_filter.conditions(sort)
+        backwards = before is not None
+        if after is not None or backwards:
+            forward_op = '<' if descending else '>'
+            backward_op = '>' if descending else '<'
+            operator = backward_op if backwards else forward_op
+            key = before if backwards else after
+            # The single-column bound lets SQLite seek the index even for collated columns
+            conditions.append(f'{expression} {operator}= ?')
+            conditions.append(f'({expression}, id) {operator} (?, ?)')
+            params.extend((key[0],) + tuple(key))
+            offset = 0
+
+        direction = 'DESC' if descending != backwards else 'ASC'
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self.connection().execute(
+            f"{SUMMARY_SELECT}{where} ORDER BY {expression} {direction}, id {direction} LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        if backwards:
+            rows.reverse()
+        return rows
+
+    @METRICS.timed('store.count_filtered')
+    def count_filtered(self, task_filter=NO_FILTER):
+        """Count the tasks matching a filter"""
+        conditions, params = task_filter.conditions()
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.connection().execute(f"SELECT COUNT(*) FROM tasks{where}", params).fetchone()[0]
+
+    @METRICS.timed('store.filter_ids')
+    def filter_ids(self, task_ids, sort='id', descending=False, task_filter=NO_FILTER):
+        """Sort and filter a set of task ids (e.g. search results) inside SQLite"""
+        conditions, params = task_filter.conditions()
+        conditions.append('id IN (SELECT value FROM json_each(?))')
+        params.append(json.dumps(list(task_ids)))
+        direction = 'DESC' if descending else 'ASC'
+        cursor = self.connection().execute(
+            f"SELECT id FROM tasks WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {SORT_COLUMNS[sort]} {direction}, id {direction}",
+            params
+        )
+        return [row[0] for row in cursor]
+
+    def schedule_summary(self):
+        """Iterate over (id, created, next_review, repeated, name) for every task, ordered by id"""
+        return self.connection().execute(SQL_SCHEDULE_SUMMARY)
+
+    def data_version(self):
+        """Return a value that changes whenever another connection commits to the database"""
+        return self.connection().execute('PRAGMA data_version').fetchone()[0]
+
+    def optimize(self):
+        """Refresh query planner statistics and fold the write-ahead log back into the database"""
+        conn = self.connection()
+        conn.execute('PRAGMA optimize')
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def release(self):
+        """Close the connection owned by the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close(self):
+        """Close every connection opened by this store"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from intervals import DEFAULT_PARAMETERS, SM2Parameters, reschedule_store, review
+from task_store import DAY, TaskStore
+
+
+class RescheduleStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = TaskStore(os.path.join(self.directory.name, 'tasks.db'))
+        now = 1_700_000_000.0
+        self.ids = [self.store.add_task(f'task {number}', now=now) for number in range(6)]
+        # Task i gets i reviews a few days apart; one of them fails once in between
+        events = []
+        seq = 0
+        for position, task_id in enumerate(self.ids):
+            for number in range(position):
+                seq += 1
+                grade = 2 if (position, number) == (4, 1) else 4 + number % 2
+                events.append((seq, 'review', task_id, grade, now + (number + 1) * 3 * DAY))
+        self.store.apply_events(events, review)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def schedule(self):
+        return {row[0]: (row[2], row[4]) for row in self.store.schedule_state()}
+
+    def test_same_parameters_leave_the_schedule_unchanged(self):
+        before = self.schedule()
+        self.assertEqual(reschedule_store(self.store, SM2Parameters()), len(self.ids))
+        self.assertEqual(self.schedule(), before)
+
+    def test_new_parameters_scale_reviewed_intervals(self):
+        before = self.schedule()
+        reschedule_store(self.store, SM2Parameters(interval_modifier=2.0), DEFAULT_PARAMETERS)
+        after = self.schedule()
+        for task_id, (interval, next_review) in before.items():
+            new_interval, new_next_review = after[task_id]
+            self.assertAlmostEqual(new_next_review - next_review, (new_interval - interval) * DAY, places=3)
+        # Five passes in a row: three of them grew the interval by the modifier
+        self.assertAlmostEqual(after[self.ids[5]][0], before[self.ids[5]][0] * 8)
+        # Not reviewed yet, or still on the first interval
+        self.assertEqual(after[self.ids[0]], before[self.ids[0]])
+        self.assertEqual(after[self.ids[1]], before[self.ids[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
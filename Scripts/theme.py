@@ -0,0 +1,184 @@
+from tkinter import font as tkfont
+from tkinter import ttk
+
+COLORS = {
+    'bg': '#0f172a',
+    'card': '#1e293b',
+    'primary': '#3b82f6',
+    'secondary': '#8b5cf6',
+    'text': '#f1f5f9',
+    'button_text': '#0f172a',
+    'text_secondary': '#94a3b8',
+    'border': '#334155',
+    'success': '#10b981',
+    'danger': '#ef4444',
+    'input_bg': '#2d3748',
+    'input_border': '#4a5568',
+    'input_focus': '#3b82f6',
+    'hover': '#475569',
+    'tabel': '#000000'
+}
+
+# Named fonts shared by every style: name -> (family, size, weight)
+FONTS = {
+    'BLTitle': ('Inter', 32, 'bold'),
+    'BLSubtitle': ('Inter', 14, 'normal'),
+    'BLAction': ('Inter', 12, 'bold'),
+    'BLWindowTitle': ('Segoe UI', 24, 'bold'),
+    'BLSection': ('Segoe UI', 14, 'bold'),
+    'BLNormal': ('Segoe UI', 11, 'normal'),
+    'BLButton': ('Segoe UI', 12, 'bold'),
+    'BLSmallButton': ('Segoe UI', 10, 'bold'),
+    'BLTable': ('Segoe UI', 10, 'normal'),
+    'BLTableHeading': ('Segoe UI', 11, 'bold')
+}
+
+THEME_FLAG = '::better_learning_theme'
+
+
+def setup_theme(root):
+    """Configure fonts and ttk styles once per Tk interpreter"""
+    if int(root.tk.call('info', 'exists', THEME_FLAG)):
+        return
+    create_fonts(root)
+    configure_styles(ttk.Style(root))
+    root.tk.call('set', THEME_FLAG, 1)
+
+
+def create_fonts(root):
+    """Create the named fonts used by the styles"""
+    existing = set(tkfont.names(root))
+    for name, (family, size, weight) in FONTS.items():
+        if name not in existing:
+            tkfont.Font(root, name=name, family=family, size=size, weight=weight)
+
+
+def configure_styles(style):
+    """Setup styles for minimalist design"""
+    colors = COLORS
+
+    # Style for main window title and subtitle
+    style.configure('Title.TLabel',
+                    background=colors['bg'],
+                    foreground=colors['text'],
+                    font='BLTitle',
+                    padding=10)
+
+    style.configure('Subtitle.TLabel',
+                    background=colors['bg'],
+                    foreground=colors['text_secondary'],
+                    font='BLSubtitle',
+                    padding=5)
+
+    # Style for window title
+    style.configure('WindowTitle.TLabel',
+                    background=colors['card'],
+                    foreground=colors['text'],
+                    font='BLWindowTitle',
+                    padding=10)
+
+    # Style for section titles
+    style.configure('Section.TLabel',
+                    background=colors['card'],
+                    foreground=colors['text'],
+                    font='BLSection',
+                    padding=5)
+
+    # Style for normal text
+    style.configure('Normal.TLabel',
+                    background=colors['card'],
+                    foreground=colors['text_secondary'],
+                    font='BLNormal',
+                    padding=2)
+
+    # Style for inline warnings
+    style.configure('Warning.TLabel',
+                    background=colors['card'],
+                    foreground=colors['danger'],
+                    font='BLNormal',
+                    padding=2)
+
+    # Style for cards/frames
+    style.configure('Card.TFrame',
+                    background=colors['card'],
+                    relief='flat',
+                    borderwidth=0)
+
+    # Style for main window action buttons
+    style.configure('Action.TButton',
+                    background=colors['primary'],
+                    foreground=colors['button_text'],
+                    borderwidth=0,
+                    font='BLAction',
+                    padding=15)
+    style.map('Action.TButton',
+              background=[('active', '#2563eb')])
+
+    # Style for primary buttons
+    style.configure('Primary.TButton',
+                    background=colors['primary'],
+                    foreground=colors['button_text'],
+                    borderwidth=0,
+                    font='BLButton',
+                    padding=12)
+    style.map('Primary.TButton',
+              background=[('active', '#2563eb')])
+
+    # Style for secondary buttons
+    style.configure('Secondary.TButton',
+                    background=colors['secondary'],
+                    foreground=colors['text'],
+                    borderwidth=0,
+                    font='BLButton',
+                    padding=12)
+    style.map('Secondary.TButton',
+              background=[('active', '#7c3aed')])
+
+    # Style for danger buttons
+    style.configure('Danger.TButton',
+                    background=colors['danger'],
+                    foreground=colors['text'],
+                    borderwidth=0,
+                    font='BLSmallButton',
+                    padding=8)
+    style.map('Danger.TButton',
+              background=[('active', '#dc2626')])
+
+    # Style for success buttons
+    style.configure('Success.TButton',
+                    background=colors['success'],
+                    foreground=colors['text'],
+                    borderwidth=0,
+                    font='BLSmallButton',
+                    padding=8)
+    style.map('Success.TButton',
+              background=[('active', '#059669')])
+
+    # Style for text input
+    style.configure('Input.TEntry',
+                    fieldbackground=colors['input_bg'],
+                    foreground=colors['text'],
+                    borderwidth=1,
+                    relief='flat',
+                    padding=10,
+                    insertcolor=colors['text'])
+    style.map('Input.TEntry',
+              fieldbackground=[('focus', '#374151')],
+              bordercolor=[('focus', colors['primary'])])
+
+    # Style for Treeview
+    style.configure('Custom.Treeview',
+                    background=colors['text'],
+                    foreground=colors['tabel'],
+                    fieldbackground=colors['text'],
+                    borderwidth=0,
+                    font='BLTable')
+
+    style.configure('Custom.Treeview.Heading',
+                    background=colors['input_bg'],
+                    foreground=colors['tabel'],
+                    relief='flat',
+                    font='BLTableHeading')
+
+    style.map('Custom.Treeview.Heading',
+              background=[('active', colors['border'])])
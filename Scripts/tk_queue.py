@@ -0,0 +1,35 @@
+import queue
+
+
+class MainLoopQueue:
+    """Hands items from worker threads to a handler running on the Tk main loop"""
+
+    def __init__(self, root, handler, interval=100):
+        self.root = root
+        self.handler = handler
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        self._after_id = self.root.after(self.interval, self.drain)
+
+    def put(self, item):
+        """Queue an item; safe to call from any thread"""
+        self._queue.put(item)
+
+    def drain(self):
+        """Pass everything queued so far to the handler in one call"""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if items:
+            self.handler(items)
+        if self._after_id is not None:
+            self._after_id = self.root.after(self.interval, self.drain)
+
+    def close(self):
+        """Stop draining the queue"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
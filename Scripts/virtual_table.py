@@ -0,0 +1,138 @@
+from tkinter import ttk
+from instrumentation import METRICS
+
+
+class IdListSource:
+    """Row source over a fixed list of task ids, such as search results"""
+
+    def __init__(self, fetch_rows, task_ids):
+        self.fetch_rows = fetch_rows
+        self.task_ids = task_ids
+
+    def count(self):
+        """Return the number of rows available"""
+        return len(self.task_ids)
+
+    def rows(self, offset, limit):
+        """Return up to limit rows starting at offset"""
+        return self.fetch_rows(self.task_ids[offset:offset + limit])
+
+
+class VirtualTable:
+    """Keeps only the rows around the scroll position inside a Treeview"""
+
+    def __init__(self, tree, scrollbar, source, format_row):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.source = source
+        self.format_row = format_row
+
+        self.offset = 0
+        self.total = 0
+        self.visible_rows = int(tree.cget('height'))
+        self.row_height = int(ttk.Style().lookup(tree.cget('style') or 'Treeview', 'rowheight') or 20)
+
+        self.tree.configure(yscrollcommand='')
+        self.scrollbar.config(command=self.on_scrollbar)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_by(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll_by(-self.visible_rows) or 'break')
+        self.tree.bind('<Next>', lambda e: self.scroll_by(self.visible_rows) or 'break')
+        self.tree.bind('<Home>', lambda e: self.scroll_to(0) or 'break')
+        self.tree.bind('<End>', lambda e: self.scroll_to(self.total) or 'break')
+        self.tree.bind('<Up>', self.on_arrow)
+        self.tree.bind('<Down>', self.on_arrow)
+
+    def set_source(self, source):
+        """Replace the row source and jump back to the top"""
+        self.source = source
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the row count and redraw the visible window"""
+        self.total = self.source.count()
+        self.scroll_to(self.offset, force=True)
+
+    def scroll_by(self, rows):
+        """Move the visible window by a number of rows"""
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset, force=False):
+        """Move the visible window so it starts at offset"""
+        offset = max(0, min(int(offset), self.total - self.visible_rows))
+        if offset != self.offset or force:
+            self.offset = offset
+            self.render()
+
+    @METRICS.timed('table.render')
+    def render(self):
+        """Put the rows of the current window into the tree"""
+        rows = self.source.rows(self.offset, self.visible_rows)
+        wanted = []
+        for index, row in enumerate(rows):
+            iid, values = self.format_row(row)
+            wanted.append(iid)
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+                self.tree.move(iid, '', index)
+            else:
+                self.tree.insert('', index, iid=iid, values=values)
+                METRICS.count('table.inserts')
+
+        keep = set(wanted)
+        stale = [iid for iid in self.tree.get_children('') if iid not in keep]
+        if stale:
+            self.tree.delete(*stale)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        """Show the window position relative to the whole dataset"""
+        if self.total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.offset / self.total
+        last = min(1.0, (self.offset + self.visible_rows) / self.total)
+        self.scrollbar.set(first, last)
+
+    def on_scrollbar(self, action, *args):
+        """Translate scrollbar commands into window moves"""
+        if action == 'moveto':
+            self.scroll_to(float(args[0]) * self.total)
+        elif action == 'scroll':
+            amount, what = int(args[0]), args[1]
+            self.scroll_by(amount * self.visible_rows if what == 'pages' else amount)
+
+    def on_mousewheel(self, event):
+        """Scroll three rows per wheel notch"""
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def on_arrow(self, event):
+        """Scroll when the keyboard focus leaves the visible window"""
+        children = self.tree.get_children('')
+        if not children:
+            return None
+        focus = self.tree.focus()
+        step = -1 if event.keysym == 'Up' else 1
+        edge = children[0] if step < 0 else children[-1]
+        if focus != edge:
+            return None
+
+        self.scroll_by(step)
+        children = self.tree.get_children('')
+        target = children[0] if step < 0 else children[-1]
+        self.tree.focus(target)
+        self.tree.selection_set(target)
+        return 'break'
+
+    def on_resize(self, event):
+        """Fit the window size to the height of the tree"""
+        heading = self.row_height + 5
+        rows = max(1, (event.height - heading) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.scroll_to(self.offset, force=True)
@@ -0,0 +1,149 @@
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+from instrumentation import METRICS
+
+
+class LongTask:
+    """A stretch of time during which the Tk main loop did not run"""
+
+    def __init__(self, started, duration, stack, samples):
+        self.started = started
+        self.duration = duration
+        self.stack = stack
+        self.samples = samples
+
+    @property
+    def location(self):
+        """The innermost frame of the blocking callback as 'file:line in function'"""
+        if not self.stack:
+            return 'unknown'
+        frame = self.stack[-1]
+        return f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}'
+
+    def format(self):
+        """Readable report with the captured stack"""
+        when = time.strftime('%H:%M:%S', time.localtime(self.started))
+        lines = [f'Main loop blocked for {self.duration:.0f} ms at {when} ({self.location})\n']
+        lines.extend(traceback.format_list(self.stack))
+        return ''.join(lines)
+
+    def as_dict(self):
+        """Return the task as JSON-friendly values"""
+        return {
+            'started': self.started,
+            'duration_ms': self.duration,
+            'location': self.location,
+            'samples': self.samples,
+            'stack': traceback.format_list(self.stack)
+        }
+
+
+def print_long_task(task):
+    """Report a long task on stderr"""
+    sys.stderr.write(task.format())
+    sys.stderr.flush()
+
+
+class MainLoopWatchdog:
+    """Detects callbacks that keep the Tk main loop busy for too long
+
+    A heartbeat scheduled with root.after stamps the time on every run. A helper thread checks
+    the stamp; once the heartbeat is late by more than `threshold` seconds it samples the main
+    thread's stack with sys._current_frames while the block lasts. When the loop runs again the
+    most frequent stack is reported through on_long_task, on the Tk thread.
+    """
+
+    def __init__(self, root, threshold=0.2, interval=0.1, on_long_task=print_long_task,
+                 metrics=METRICS, keep=20):
+        self.root = root
+        self.threshold = threshold
+        self.interval = interval
+        self.on_long_task = on_long_task
+        self.metrics = metrics
+        self.reports = collections.deque(maxlen=keep)
+        self.last_lag = 0.0
+
+        self._lock = threading.Lock()
+        self._samples = []
+        self._blocked_since = None
+        self._last_beat = None
+        self._main_id = None
+        self._after_id = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the heartbeat; must be called from the Tk thread"""
+        if self._thread is not None:
+            return
+        self._main_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._after_id = self.root.after(int(self.interval * 1000), self.beat)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='main-loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the main loop and wait for the watcher thread"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def beat(self):
+        """Heartbeat on the Tk thread: measure lag and report a block that just ended"""
+        now = time.perf_counter()
+        self.last_lag = max(0.0, (now - self._last_beat - self.interval) * 1000)
+        if self.metrics.enabled:
+            self.metrics.record('tk.loop_lag', self.last_lag)
+
+        with self._lock:
+            self._last_beat = now
+            samples, self._samples = self._samples, []
+            blocked_since, self._blocked_since = self._blocked_since, None
+        self._after_id = self.root.after(int(self.interval * 1000), self.beat)
+
+        if samples:
+            stack, _ = collections.Counter(samples).most_common(1)[0]
+            duration = (now - blocked_since) * 1000
+            task = LongTask(time.time() - duration / 1000, duration, traceback.StackSummary.from_list(stack),
+                            len(samples))
+            self.reports.append(task)
+            self.metrics.count('tk.long_tasks')
+            if self.metrics.enabled:
+                self.metrics.record('tk.long_task', duration)
+            if self.on_long_task is not None:
+                self.on_long_task(task)
+
+    def _watch(self):
+        poll = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(poll):
+            now = time.perf_counter()
+            with self._lock:
+                expected = self._last_beat + self.interval
+                if now - expected < self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._main_id)
+                if frame is None:
+                    continue
+                if self._blocked_since is None:
+                    self._blocked_since = expected
+                self._samples.append(tuple((entry.filename, entry.lineno, entry.name, entry.line)
+                                           for entry in callback_stack(frame)))
+
+
+def callback_stack(frame):
+    """Extract a stack, dropping the frames of Tk's main loop below the running callback"""
+    stack = traceback.extract_stack(frame)
+    for index in range(len(stack) - 1, -1, -1):
+        entry = stack[index]
+        if entry.name == '__call__' and entry.filename.replace('\\', '/').endswith('tkinter/__init__.py'):
+            return stack[index + 1:]
+    return stack
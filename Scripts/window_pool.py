@@ -0,0 +1,32 @@
+class WindowPool:
+    """Keeps one hidden instance of each dialog and reuses it instead of rebuilding"""
+
+    def __init__(self, main_root):
+        self.main_root = main_root
+        self._windows = {}
+
+    def show(self, window_class, *args):
+        """Show the pooled instance of a window class, building it on first use"""
+        window = self._windows.get(window_class)
+        if window is None or not window.root.winfo_exists():
+            window = self._windows[window_class] = window_class(self.main_root, *args)
+        else:
+            window.reset()
+        window.show()
+        return window
+
+    def prepare(self, window_class, *args):
+        """Build a window ahead of time and keep it hidden"""
+        window = self._windows.get(window_class)
+        if window is None or not window.root.winfo_exists():
+            window = self._windows[window_class] = window_class(self.main_root, *args)
+            window.hide()
+        return window
+
+    def destroy(self):
+        """Destroy every pooled window"""
+        for window in self._windows.values():
+            if window.root.winfo_exists():
+                window.close_window()
+                window.root.destroy()
+        self._windows.clear()